@@ -1,12 +1,21 @@
-from typing import Callable, Dict, Any
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Any, List
+from frame.namespace import NamespaceAccessor
 from frame.notification_targets import make_notification_target
 from frame.registry import TypeRegistry
 from frame.renderers import RendererBase, make_renderer
 from frame.shell import run_command
+from frame.watchdog import activity
+from frame.writers import file_writers
 from frame.parsers import make_parser
 from pythonosc import udp_client
 import jinja2
 import asyncio
+import time
+import uuid
+
+if TYPE_CHECKING:
+    from frame.model import Config
 
 
 class ActionBase:
@@ -20,14 +29,21 @@ class ActionBase:
 
     def __init__(self, settings: Dict[str, Any]) -> None:
         self.renderer = None
+        self.settings = settings
         self.name = settings["name"]
         self.url = f"/action/{self.name}"
         self.display_name = settings.get("name", self.name)
-        pass
+        self.concurrency = int(settings["concurrency"]) if settings.get("concurrency") else None
+        self.on_busy = settings.get("on_busy", "queue")
+        if self.on_busy not in ("queue", "drop", "replace"):
+            raise ValueError(f"Invalid on_busy setting for action {self.name}: {self.on_busy}")
 
     async def call(self, params: Dict[str, Any], get_action) -> Any:
         raise NotImplementedError("Subclasses must implement this method")
 
+    def close(self):
+        """Release what the action holds, when it is removed or rebuilt by a reload."""
+
 
 actions = TypeRegistry[ActionBase]("action", {"renderer": "action"})
 
@@ -40,6 +56,152 @@ def make_action(config: "Config", name: str, settings: str | Dict[str, Any]) ->
     )[0]
 
 
+class Job:
+    """A single invocation of an action, tracked by the ActionExecutor."""
+
+    id: str
+    action_name: str
+    params: Dict[str, Any]
+    status: str
+    result: Any
+    error: str | None
+    task: asyncio.Task[None] | None
+
+    def __init__(self, action_name: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.action_name = action_name
+        self.params = params
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.task = None
+        self.created = time.time()
+        self.started: float | None = None
+        self.finished: float | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled", "dropped")
+
+    def cancel(self) -> bool:
+        if self.task is None or self.done:
+            return False
+        return self.task.cancel()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Jobs are pickled when sent between workers (see `Cluster`); the task stays behind
+        return {**self.__dict__, "task": None}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "action": self.action_name,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class ActionExecutor:
+    """Runs actions as jobs, applying each action's `concurrency` and `on_busy` policy.
+
+    - queue: wait for a free slot (an identical queued request is reused rather than added)
+    - drop: refuse the new request while the action is busy
+    - replace: cancel whatever is queued or running and start the new request
+    """
+
+    def __init__(self, get_action: Callable[[str], ActionBase], history: int = 100):
+        self.get_action = get_action
+        self.history = history
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self.active: Dict[str, List[Job]] = {}
+        self.slots: Dict[str, asyncio.Semaphore] = {}
+        self.listeners: List[Callable[[str, Job], None]] = []
+
+    def notify(self, event: str, job: Job):
+        for listener in self.listeners:
+            listener(event, job)
+
+    def submit(self, action_name: str, params: Dict[str, Any]) -> Job:
+        action = self.get_action(action_name)
+        active = self.active.setdefault(action_name, [])
+
+        if action.concurrency is not None and len(active) >= action.concurrency:
+            if action.on_busy == "drop":
+                job = Job(action_name, params)
+                job.status = "dropped"
+                job.finished = job.created
+                self.remember(job)
+                self.notify("finished", job)
+                return job
+            elif action.on_busy == "replace":
+                for other in list(active):
+                    other.cancel()
+            else:
+                for other in active:
+                    if other.status == "queued" and other.params == params:
+                        return other
+
+        job = Job(action_name, params)
+        active.append(job)
+        self.remember(job)
+        self.notify("submitted", job)
+        job.task = asyncio.ensure_future(self.run(action, job))
+        job.task.add_done_callback(lambda _: self.finish(job))
+        return job
+
+    async def run(self, action: ActionBase, job: Job):
+        activity.set(f"action:{job.action_name}")
+        try:
+            if action.concurrency is not None:
+                slot = self.slots.setdefault(action.name, asyncio.Semaphore(action.concurrency))
+                async with slot:
+                    await self.execute(action, job)
+            else:
+                await self.execute(action, job)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.result = getattr(e, "result", None)
+
+    def finish(self, job: Job):
+        if not job.done:
+            job.status = "cancelled"
+        job.finished = time.time()
+        self.active[job.action_name].remove(job)
+        self.notify("finished", job)
+
+    async def execute(self, action: ActionBase, job: Job):
+        job.status = "running"
+        job.started = time.time()
+        job.result = await action.call(job.params, self.get_action)
+        job.status = "done"
+
+    async def wait(self, job: Job, timeout: float | None = None) -> Job:
+        """Wait for `job` to finish without cancelling it if the waiter goes away."""
+        if job.task is not None and not job.task.done():
+            await asyncio.wait([job.task], timeout=timeout)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        return job is not None and job.cancel()
+
+    def remember(self, job: Job):
+        self.jobs[job.id] = job
+        for old_id in list(self.jobs.keys()):
+            if len(self.jobs) <= self.history:
+                break
+            if self.jobs[old_id].done:
+                del self.jobs[old_id]
+
+
 ############################################################
 # Implementations
 ############################################################
@@ -58,57 +220,12 @@ class ShellAction(ActionBase, name="shell"):
         return result
 
 
-class NestedAccessor:
-    def __init__(self, dict: Dict[str, Any]):
-        self.dict = dict
-
-    def keys(self):
-        # Extract unique top-level keys from the dictionary
-        result = set()
-        for key in self.dict.keys():
-            # Get the top-level part (everything before the first dot, or the whole key if no dot)
-            top_level = key.split(".", 1)[0]
-            result.add(top_level)
-
-        return result
-
-    def __getattr__(self, name):
-        # Check if the name exists as a direct key
-        if name in self.dict:
-            return self.dict[name]
-
-        # Look for dot-separated keys that start with this name
-        prefix = f"{name}."
-        nested_dict = {}
-        for key, value in self.dict.items():
-            if key == name:
-                return value
-            if key.startswith(prefix):
-                suffix = key[len(prefix) :]
-                nested_dict[suffix] = value
-
-        # If we found nested keys, return a new accessor for them
-        if nested_dict:
-            return NestedAccessor(nested_dict)
-
-        # Otherwise raise an attribute error
-        raise AttributeError(f"'{type(self).__name__}' has no attribute '{name}'")
-
-    def __getitem__(self, key):
-        # Support dictionary-style access with []
-        try:
-            return self.__getattr__(key)
-        except AttributeError:
-            raise KeyError(key)
-
-
 class Condition:
     def __init__(self, condition: str):
         self.template = jinja2.Template("{{ " + condition + " }}")
         self.last_value = None
 
-    def __call__(self, context: Dict[str, Any], then: Callable[[Any], None]):
-        # accessor = NestedAccessor(context)
+    def __call__(self, context: Dict[str, Any] | NamespaceAccessor, then: Callable[[Any], None]):
         result = self.template.render(**context)
 
         if result.lower() in ("true", "yes", "1"):
@@ -136,9 +253,12 @@ class NotificationAction(ActionBase, name="notification"):
         self.message = settings.get("message")
         self.message_template = jinja2.Template(self.message)
         self.condition = Condition(settings.get("condition", "false"))
-        self.subscription = config.subscribe(lambda m: m, lambda m: self.condition(m, self.notify))
+        self.config = config
+        self.subscription = config.subscribe(lambda m: m, lambda m: self.condition(config.accessor(m), self.notify), keys=["*"])
 
-    def notify(self, context: Dict[str, Any], result: Any):
+    def notify(self, context: NamespaceAccessor, result: Any):
+        if not self.config.cluster.runner:
+            return
         message_rendered = self.message_template.render(**context)
         for target in self.targets:
             asyncio.create_task(target.notify({"message": message_rendered}))
@@ -147,23 +267,138 @@ class NotificationAction(ActionBase, name="notification"):
         print(self.message)
         return None
 
+    def close(self):
+        self.subscription.unsubscribe()
+
+
+class SequenceError(Exception):
+    def __init__(self, message: str, result: Any):
+        super().__init__(message)
+        self.result = result
+
+
+class SequenceStep:
+    id: str
+    action: ActionBase | None
+    action_name: str | None
+    after: List[str]
+    params: Dict[str, Any]
+
+    def __init__(self, sequence: "SequenceAction", index: int, settings: str | Dict[str, Any], config: "Config"):
+        self.action = None
+        self.action_name = None
+
+        if isinstance(settings, str):
+            settings = {"action": settings}
+        else:
+            settings = dict(settings)
+
+        after = settings.pop("after", [])
+        self.after = [after] if isinstance(after, str) else list(after)
+        self.params = settings.pop("params", {})
+        step_id = settings.pop("id", None)
+
+        if "action" in settings:
+            self.action_name = settings["action"]
+            self.id = step_id or self.action_name
+        else:
+            self.id = step_id or f"{sequence.name}_{index}"
+            self.action = make_action(config, self.id, settings)
+
+    def resolve(self, get_action) -> ActionBase:
+        return self.action if self.action is not None else get_action(self.action_name)
+
 
 class SequenceAction(ActionBase, name="sequence"):
-    def __init__(self, settings: Dict[str, Any]):
+    """Runs a list of steps, each either an action name or an inline action.
+
+    mode: sequential (default) runs steps in order and stops at the first failure,
+    parallel runs every step at once, and graph runs each step as soon as the steps
+    listed in its `after` have finished. `max_parallel` caps how many run at a time."""
+
+    def __init__(self, settings: Dict[str, Any], config: "Config"):
         super().__init__(settings)
-        self.actions = []
-        for i, action_config in enumerate(settings["actions"]):
-            action_name = f"{self.name}_{i}"
-            action_instance = make_action(config, action_name, action_config)
-            self.actions.append(action_instance)
+        self.mode = settings.get("mode", "sequential")
+        self.max_parallel = int(settings["max_parallel"]) if settings.get("max_parallel") else None
+        self.steps = [SequenceStep(self, i, step, config) for i, step in enumerate(settings["actions"])]
+        self.dependencies = self.make_dependencies()
 
         if settings.get("renderer"):
             self.renderer, _ = make_renderer(settings["renderer"])
 
+    def make_dependencies(self) -> Dict[str, List[str]]:
+        ids: List[str] = []
+        for i, step in enumerate(self.steps):
+            if step.id in ids:
+                if self.mode == "graph":
+                    raise ValueError(f"Duplicate step id in sequence {self.name}: {step.id}")
+                step.id = f"{step.id}_{i}"
+            ids.append(step.id)
+
+        if self.mode == "sequential":
+            return {step.id: ids[:i][-1:] for i, step in enumerate(self.steps)}
+        elif self.mode == "parallel":
+            return {step.id: [] for step in self.steps}
+        elif self.mode != "graph":
+            raise ValueError(f"Invalid mode for sequence {self.name}: {self.mode}")
+
+        dependencies = {step.id: step.after for step in self.steps}
+        for step_id, after in dependencies.items():
+            for dependency in after:
+                if dependency not in dependencies:
+                    raise ValueError(f"Step {step_id} in sequence {self.name} depends on unknown step {dependency}")
+
+        # Kahn's algorithm, only to reject cycles up front
+        remaining = {step_id: set(after) for step_id, after in dependencies.items()}
+        while remaining:
+            ready = [step_id for step_id, after in remaining.items() if not after]
+            if not ready:
+                raise ValueError(f"Circular dependency in sequence {self.name}: {sorted(remaining)}")
+            for step_id in ready:
+                del remaining[step_id]
+            for after in remaining.values():
+                after.difference_update(ready)
+
+        return dependencies
+
     async def call(self, params: Dict[str, Any], get_action) -> Any:
-        for action in self.actions:
-            await get_action(action).call(params, get_action)
-        return None
+        start = time.monotonic()
+        results: Dict[str, Dict[str, Any]] = {}
+        finished = {step.id: asyncio.Event() for step in self.steps}
+        slots = asyncio.Semaphore(self.max_parallel) if self.max_parallel else None
+
+        async def run_step(step: SequenceStep):
+            for dependency in self.dependencies[step.id]:
+                await finished[dependency].wait()
+
+            result: Dict[str, Any] = {"step": step.id, "status": "skipped", "start": None, "duration": None}
+            try:
+                if all(results[dependency]["status"] == "done" for dependency in self.dependencies[step.id]):
+                    if slots is not None:
+                        await slots.acquire()
+                    try:
+                        step_start = time.monotonic()
+                        result["start"] = step_start - start
+                        result["result"] = await step.resolve(get_action).call({**params, **step.params}, get_action)
+                        result["status"] = "done"
+                    except Exception as e:
+                        result["status"] = "failed"
+                        result["error"] = str(e)
+                    finally:
+                        result["duration"] = time.monotonic() - step_start
+                        if slots is not None:
+                            slots.release()
+            finally:
+                results[step.id] = result
+                finished[step.id].set()
+
+        await asyncio.gather(*[run_step(step) for step in self.steps])
+
+        steps = [results[step.id] for step in self.steps]
+        failed = [result["step"] for result in steps if result["status"] == "failed"]
+        if failed:
+            raise SequenceError(f"Steps failed in {self.name}: {', '.join(failed)}", steps)
+        return steps
 
 
 class OSCAction(ActionBase, name="osc"):
@@ -182,23 +417,30 @@ class OSCAction(ActionBase, name="osc"):
 
 
 class FileWriteAction(ActionBase, name="file_write"):
+    """Writes a rendered template through the shared writer thread.
+
+    Appends are buffered and flushed by size (`flush_bytes`) or age (`flush_interval`),
+    optionally fsynced every `fsync_interval` seconds and rotated past `rotate_bytes`.
+    Set `wait: true` to wait for each write to reach the file; overwrites always wait."""
+
     def __init__(self, settings: Dict[str, Any]):
         super().__init__(settings)
         self.path = settings["path"]
         self.template_str = settings["template"]
         self.template = jinja2.Template(self.template_str)
         self.append = settings.get("append", False)
+        self.wait = settings.get("wait", not self.append)
+        file_writers.configure(self.path, settings)
 
         if settings.get("renderer"):
             self.renderer, _ = make_renderer(settings["renderer"])
 
-    def _write_sync(self, content: str):
-        mode = 'a' if self.append else 'w'
-        with open(self.path, mode) as f:
-            f.write(content)
-
     async def call(self, params: Dict[str, Any], get_action) -> Any:
         rendered_content = self.template.render(**params)
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self._write_sync, rendered_content)
+        written = file_writers.write(self.path, rendered_content, append=self.append)
+        if self.wait:
+            await asyncio.wrap_future(written)
         return None
+
+    def close(self):
+        file_writers.release(self.path)
@@ -0,0 +1,272 @@
+import asyncio
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator, List
+
+import httpx
+import yaml
+
+
+def percentiles(samples: List[float], points=(50, 95, 99)) -> Dict[str, float]:
+    if not samples:
+        return {f"p{point}": float("nan") for point in points}
+    ordered = sorted(samples)
+    return {f"p{point}": ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))] for point in points}
+
+
+def format_ms(values: Dict[str, float]) -> str:
+    return "  ".join(f"{name}={value * 1000:.1f}ms" for name, value in values.items())
+
+
+@contextmanager
+def server_processes(configs: List[str], base_port: int) -> Iterator[List[subprocess.Popen]]:
+    """Run one uvicorn server per config file on consecutive ports."""
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "frame.main:app", "--port", str(base_port + i), "--log-level", "warning"],
+            env={**os.environ, "FRAME_CONFIG": path, "PYTHONPATH": src_dir},
+        )
+        for i, path in enumerate(configs)
+    ]
+    try:
+        yield processes
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+############################################################
+# Startup
+############################################################
+def startup_benchmark(runs: int, properties: int, delay: float, port: int):
+    """Time how long a restarted server takes to answer, with `properties` values that each
+    take `delay` seconds to fetch and one that never returns."""
+    directory = tempfile.mkdtemp(prefix="frame-startup-")
+    path = os.path.join(directory, "startup.yaml")
+    model = {f"slow{i}": {"get": {"type": "shell", "cmd": f"sleep {delay}; echo {i}"}} for i in range(properties)}
+    model["hung"] = {"get": {"type": "shell", "cmd": "sleep 3600"}, "timeout": delay * 2}
+    with open(path, "w") as f:
+        yaml.safe_dump(
+            {
+                "name": "Startup benchmark",
+                "password_hash": hashlib.sha256(b"bench").hexdigest(),
+                "settings": {"snapshot": {"path": os.path.join(directory, "snapshot")}},
+                "model": model,
+            },
+            f,
+        )
+
+    url = f"http://127.0.0.1:{port}"
+    timings: Dict[str, List[float]] = {"login page": [], "home page": [], "first value": [], "all values": []}
+    for run in range(runs):
+        start = time.monotonic()
+        with server_processes([path], port), httpx.Client(base_url=url, timeout=delay * 4) as client:
+            while True:
+                try:
+                    client.get("/login").raise_for_status()
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            timings["login page"].append(time.monotonic() - start)
+
+            client.post("/login", data={"password": "bench"})
+            client.get("/").raise_for_status()
+            timings["home page"].append(time.monotonic() - start)
+
+            # The SSE stream sends every property at once, then each value as it arrives
+            loaded = set()
+            with client.stream("GET", "/updates") as response:
+                for line in response.iter_lines():
+                    if line.startswith("event:model-slow"):
+                        event = line.removeprefix("event:")
+                    elif line.startswith("data:") and "Loading" not in line and event:
+                        if not loaded:
+                            timings["first value"].append(time.monotonic() - start)
+                        loaded.add(event)
+                        event = None
+                        if len(loaded) == properties:
+                            break
+                    elif not line.startswith("data:"):
+                        event = None
+            timings["all values"].append(time.monotonic() - start)
+        print(f"run {run + 1}: " + "  ".join(f"{name}={values[-1] * 1000:.0f}ms" for name, values in timings.items() if values))
+
+    for name, values in timings.items():
+        print(f"{name}: {format_ms(percentiles(values, (50, 95)))}")
+
+
+############################################################
+# SSE load
+############################################################
+def sse_benchmark(clients: int, properties: int, rate: float, duration: float, speed: float, recording: str, port: int):
+    """Drive `clients` SSE connections against a server whose values are replayed.
+
+    Without a `recording` directory (as written by `settings.record`), `properties`
+    synthetic values are recorded at `rate` updates per second each. The server journals
+    every state change, so latency is the time from a value entering the state to each
+    client receiving it."""
+    from frame.journal import JournalReader
+
+    directory = tempfile.mkdtemp(prefix="frame-sse-")
+    if not recording:
+        recording = os.path.join(directory, "recording")
+        os.makedirs(recording)
+        for p in range(properties):
+            with open(os.path.join(recording, f"p{p}.jsonl"), "w") as f:
+                for k in range(int(rate * 60)):
+                    f.write(json.dumps({"t": k / rate, "raw": f"r{p}x{k}"}) + "\n")
+
+    model = {name.removesuffix(".jsonl"): {"get": {"type": "replay", "path": os.path.join(recording, name), "speed": speed}} for name in sorted(os.listdir(recording)) if name.endswith(".jsonl")}
+    path = os.path.join(directory, "sse.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(
+            {
+                "name": "SSE benchmark",
+                "password_hash": hashlib.sha256(b"bench").hexdigest(),
+                "settings": {"snapshot": {"enabled": False}, "journal": {"path": os.path.join(directory, "journal")}},
+                "model": model,
+            },
+            f,
+        )
+
+    url = f"http://127.0.0.1:{port}"
+    received: List[tuple[str, str, float]] = []
+
+    async def client(cookies: httpx.Cookies, end: float):
+        async with httpx.AsyncClient(base_url=url, cookies=cookies, timeout=None) as http:
+            async with http.stream("GET", "/updates") as response:
+                event = None
+                async for line in response.aiter_lines():
+                    now = time.time()
+                    if line.startswith("event:"):
+                        event = line.removeprefix("event:model-")
+                    elif line.startswith("data:") and event:
+                        received.append((event, line, now))
+                        event = None
+                    if time.monotonic() > end:
+                        return
+
+    async def run(cookies: httpx.Cookies) -> tuple[Dict[str, float], Dict[str, float], float, float]:
+        async with httpx.AsyncClient(base_url=url, cookies=cookies) as http:
+            before = (await http.get("/debug/process")).json()
+            start = time.time()
+            end = time.monotonic() + duration
+            await asyncio.gather(*[client(cookies, end) for _ in range(clients)])
+            after = (await http.get("/debug/process")).json()
+        return before, after, start, time.time()
+
+    with server_processes([path], port), httpx.Client(base_url=url) as http:
+        while True:
+            try:
+                http.get("/login").raise_for_status()
+                break
+            except httpx.TransportError:
+                time.sleep(0.05)
+        http.post("/login", data={"password": "bench"})
+        before, after, start, end = asyncio.run(run(http.cookies))
+
+    # Match what each client received to when the value entered the server's state
+    entered: Dict[tuple[str, str], List[float]] = {}
+    updates = 0
+    for record in JournalReader(os.path.join(directory, "journal")).records(start, end):
+        if record["kind"] == "state":
+            updates += len(record["values"])
+            for name, value in record["values"].items():
+                entered.setdefault((name, str(value).strip()), []).append(record["t"])
+
+    latencies = []
+    for name, data, now in received:
+        value = data.removeprefix("data:").strip().removeprefix("<div class='value'>").removesuffix("</div>").strip()
+        times = [t for t in entered.get((name, value), []) if t <= now]
+        if times:
+            latencies.append(now - times[-1])
+
+    cpu = after["cpu"] - before["cpu"]
+    print(f"{clients} clients, {len(model)} properties, {updates / (end - start):.0f} updates/s, {len(received) / (end - start):.0f} events/s delivered")
+    print(f"latency: {format_ms(percentiles(latencies))}  max={max(latencies, default=0) * 1000:.1f}ms  ({len(latencies)} matched)")
+    print(f"server cpu: {cpu:.2f}s ({cpu / max(updates, 1) * 1e6:.0f}us per update, {cpu / max(len(received), 1) * 1e6:.0f}us per event)")
+    print(f"server peak rss: {before['max_rss'] / 2**20:.1f}MB -> {after['max_rss'] / 2**20:.1f}MB")
+
+
+############################################################
+# Fleet
+############################################################
+def fleet_benchmark(agents: int, properties: int, rate: float, duration: float, base_port: int, base_osc_port: int):
+    """Aggregate `agents` local frame agents, each with `properties` OSC-fed values.
+
+    The benchmark sends the current time to every property `rate` times per second, so
+    the aggregator can measure end-to-end latency from the value itself."""
+    from pythonosc.udp_client import SimpleUDPClient
+
+    from frame.model import Config
+
+    directory = tempfile.mkdtemp(prefix="frame-fleet-")
+    configs = []
+    for i in range(agents):
+        path = os.path.join(directory, f"agent{i}.yaml")
+        with open(path, "w") as f:
+            yaml.safe_dump(
+                {
+                    "name": f"Agent {i}",
+                    "password_hash": "",
+                    "settings": {"agent": {"token": "bench"}, "osc_server": {"address": "127.0.0.1", "port": base_osc_port + i}},
+                    "model": {f"p{p}": {"get": {"type": "osc", "address": f"/p{p}"}} for p in range(properties)},
+                },
+                f,
+            )
+        configs.append(path)
+
+    async def aggregate():
+        fleet_settings = {
+            "timeout": 60,
+            "agents": {f"agent{i}": {"url": f"http://127.0.0.1:{base_port + i}", "token": "bench", "heartbeat": 2} for i in range(agents)},
+        }
+        start = time.monotonic()
+        config = Config({"password_hash": "", "settings": {"fleet": fleet_settings}})
+        latencies: List[float] = []
+
+        # Agents take a moment to start; keep reconnect delays short while waiting for them
+        for agent in config.fleet.agents.values():
+            agent.max_delay = 0.5
+        await config.done()
+        connected = sum(agent.connected for agent in config.fleet.agents.values())
+        print(f"{connected}/{agents} agents connected, {len(config.get_properties())} properties in {time.monotonic() - start:.2f}s")
+
+        def record(value):
+            if value is not None:
+                latencies.append(time.time() - float(value))
+
+        for name in config.get_properties():
+            config.subscribe(lambda m, name=name: m.get(name), record, keys=[name])
+
+        clients = [SimpleUDPClient("127.0.0.1", base_osc_port + i) for i in range(agents)]
+        sent = 0
+        cpu_start = time.process_time()
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            tick = time.monotonic()
+            for client in clients:
+                for p in range(properties):
+                    # As a string: OSC floats are 32 bit, too coarse for a timestamp
+                    client.send_message(f"/p{p}", repr(time.time()))
+                    sent += 1
+            await asyncio.sleep(max(0.0, 1.0 / rate - (time.monotonic() - tick)))
+        await asyncio.sleep(1)
+        cpu = time.process_time() - cpu_start
+
+        print(f"sent {sent} values, received {len(latencies)} updates ({len(latencies) / duration:.0f}/s)")
+        print(f"latency: {format_ms(percentiles(latencies))}  max={max(latencies, default=0) * 1000:.1f}ms")
+        print(f"aggregator cpu: {cpu:.2f}s ({cpu / max(len(latencies), 1) * 1e6:.0f}us per update)")
+        print(f"dropped connections: {sum(agent.reconnects for agent in config.fleet.agents.values())}")
+
+    with server_processes(configs, base_port):
+        asyncio.run(aggregate())
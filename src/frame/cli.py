@@ -1,3 +1,8 @@
+from datetime import datetime
+import json
+import os
+import time
+
 import typer
 import uvicorn
 
@@ -5,17 +10,74 @@ app_cli = typer.Typer()
 
 
 @app_cli.command()
-def run_server(host: str = "0.0.0.0", port: int = 8000):
+def run_server(host: str = "0.0.0.0", port: int = 8000, workers: int = 1):
     """Run the FastAPI server"""
+    if workers > 1:
+        # One worker runs the pollers, the rest replicate its state (see frame.cluster)
+        os.environ["FRAME_WORKERS"] = str(workers)
+        uvicorn.run("frame.main:app", host=host, port=port, workers=workers)
+        return
+
     uvicorn.run(
         "frame.main:app",
         host=host,
         port=port,
         reload=True,
-        reload_includes=["*.yaml", "*.py"],
+        # Config edits are applied in place by Config.watch, without dropping connections
+        reload_includes=["*.py"],
         reload_dirs=["examples", "src/frame"],
     )
 
 
+def parse_time(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+@app_cli.command()
+def journal_replay(directory: str, at: str = ""):
+    """Print the state recorded in a journal as of `at` (ISO time or unix seconds, default: latest)"""
+    from frame.journal import JournalReader
+
+    state = JournalReader(directory).state_at(parse_time(at) if at else time.time())
+    print(json.dumps(state, indent=2))
+
+
+@app_cli.command()
+def journal_events(directory: str, since: str = "", until: str = ""):
+    """Print the state changes and action calls recorded in a journal between two times"""
+    from frame.journal import JournalReader
+
+    reader = JournalReader(directory)
+    for record in reader.records(parse_time(since) if since else 0, parse_time(until) if until else float("inf")):
+        print(f"{datetime.fromtimestamp(record['t']).isoformat(timespec='milliseconds')} {json.dumps({k: v for k, v in record.items() if k != 't'})}")
+
+
+@app_cli.command()
+def startup_bench(runs: int = 5, properties: int = 20, delay: float = 2.0, port: int = 18000):
+    """Benchmark time to first byte after a restart, with slow and hanging values"""
+    from frame.bench import startup_benchmark
+
+    startup_benchmark(runs, properties, delay, port)
+
+
+@app_cli.command()
+def sse_bench(clients: int = 50, properties: int = 20, rate: float = 5, duration: float = 10, speed: float = 1, recording: str = "", port: int = 18200):
+    """Benchmark the SSE pipeline with simulated clients and replayed values"""
+    from frame.bench import sse_benchmark
+
+    sse_benchmark(clients, properties, rate, duration, speed, recording, port)
+
+
+@app_cli.command()
+def fleet_bench(agents: int = 24, properties: int = 10, rate: float = 10, duration: float = 10, base_port: int = 18100, base_osc_port: int = 19100):
+    """Benchmark an aggregator against local agent processes"""
+    from frame.bench import fleet_benchmark
+
+    fleet_benchmark(agents, properties, rate, duration, base_port, base_osc_port)
+
+
 if __name__ == "__main__":
     app_cli()
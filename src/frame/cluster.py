@@ -0,0 +1,302 @@
+import asyncio
+import fcntl
+import hashlib
+import itertools
+import os
+import pickle
+import socket
+import struct
+from typing import TYPE_CHECKING, Any, Dict, List, Set
+
+from frame.images import ImageRef, image_repo
+from frame.utility import private_directory
+
+if TYPE_CHECKING:
+    from frame.model import Config
+
+# Config methods a follower may ask the runner to perform on its behalf
+RPC_METHODS = {"submit", "do", "get_job", "cancel_job", "get_jobs"}
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Any:
+    (length,) = struct.unpack("!I", await reader.readexactly(4))
+    return pickle.loads(await reader.readexactly(length))
+
+
+def write_frame(writer: asyncio.StreamWriter, message: Any):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(struct.pack("!I", len(data)) + data)
+
+
+def peer_uid(writer: asyncio.StreamWriter) -> int | None:
+    """The uid of the process on the other end of a Unix socket, where the platform reports it."""
+    sock = writer.get_extra_info("socket")
+    if sock is None or not hasattr(socket, "SO_PEERCRED"):
+        return None
+    _, uid, _ = struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    return uid
+
+
+class Peer:
+    """The runner's connection to one follower.
+
+    State changes are coalesced per property while the follower is busy, so a slow
+    worker receives the latest values rather than an ever-growing backlog."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.state: Dict[str, Any] = {}
+        self.messages: List[Any] = []
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.ensure_future(self.send_loop())
+
+    def send_state(self, values: Dict[str, Any]):
+        self.state.update(values)
+        self.wakeup.set()
+
+    def send(self, message: Any):
+        self.messages.append(message)
+        self.wakeup.set()
+
+    async def send_loop(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+
+                messages, self.messages = self.messages, []
+                for message in messages:
+                    self.write(message)
+                if self.state:
+                    state, self.state = self.state, {}
+                    self.write(("state", state))
+                await self.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def write(self, message: Any):
+        """Write one message, replacing whatever can't be pickled so the stream carries on."""
+        try:
+            write_frame(self.writer, message)
+            return
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            error = e
+
+        if message[0] == "reply":
+            write_frame(self.writer, ("reply", message[1], None, f"Could not send result: {error!r}"))
+        elif message[0] == "state":
+            for key, value in message[1].items():
+                try:
+                    write_frame(self.writer, ("state", {key: value}))
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    print(f"Not replicating {key}: {e!r}")
+        else:
+            print(f"Dropping {message[0]} message: {error!r}")
+
+    def close(self):
+        self.task.cancel()
+        self.writer.close()
+
+
+class Cluster:
+    """Shares one Config between several uvicorn worker processes.
+
+    The worker holding the lock file becomes the runner: it runs every poller, getter
+    and action, and publishes state changes and new login tokens over a Unix socket.
+    The other workers follow, serving HTTP / SSE from the replicated state and
+    forwarding action requests to the runner. If the runner exits, a follower takes
+    over the lock and starts polling."""
+
+    runner: bool
+    tokens: Set[str]
+
+    def __init__(self, config: "Config", settings: Dict[str, Any]):
+        self.config = config
+        self.enabled = settings.get("enabled", int(os.environ.get("FRAME_WORKERS", "1")) > 1)
+        self.socket_path = settings.get("socket")
+        self.lock_path = settings.get("lock")
+        self.runner = True
+        self.tokens = set()
+        self.peers: List[Peer] = []
+        self.writer: asyncio.StreamWriter | None = None
+        self.replies: Dict[int, asyncio.Future[Any]] = {}
+        self.request_ids = itertools.count()
+        self.lock_file = None
+        self.server: asyncio.Server | None = None
+        self.task: asyncio.Task[None] | None = None
+
+    async def start(self):
+        """Become the runner, or follow the existing one and wait for its state."""
+        if not self.enabled:
+            return
+
+        if self.socket_path is None:
+            # Peers unpickle what they're sent, so only this user may reach the socket
+            self.socket_path = os.path.join(private_directory(), f"{hashlib.sha1(os.getcwd().encode()).hexdigest()[:8]}.sock")
+        if self.lock_path is None:
+            self.lock_path = self.socket_path + ".lock"
+
+        self.runner = False
+        synced = asyncio.get_running_loop().create_future()
+        self.task = asyncio.ensure_future(self.run(synced))
+        await synced
+
+    def try_lock(self) -> bool:
+        if self.lock_file is None:
+            self.lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    async def run(self, synced: asyncio.Future[None]):
+        while True:
+            if self.try_lock():
+                await self.lead()
+                if not synced.done():
+                    synced.set_result(None)
+                return
+
+            try:
+                reader, self.writer = await asyncio.open_unix_connection(self.socket_path)
+            except (ConnectionError, FileNotFoundError):
+                await asyncio.sleep(0.1)
+                continue
+
+            if peer_uid(self.writer) not in (None, os.getuid()):
+                print(f"Refusing runner at {self.socket_path} owned by another user")
+                self.writer.close()
+                self.writer = None
+                await asyncio.sleep(1)
+                continue
+
+            try:
+                await self.follow(reader, synced)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            finally:
+                self.writer = None
+                for reply in self.replies.values():
+                    # Callers that were cancelled have already given up on theirs
+                    if not reply.done():
+                        reply.set_exception(ConnectionError("Lost connection to the runner"))
+                self.replies.clear()
+
+    ##########################################################################
+    # RUNNER
+    ##########################################################################
+    async def lead(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.server = await asyncio.start_unix_server(self.accept, self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self.runner = True
+        print(f"Worker {os.getpid()} is the runner")
+        await self.config.lead()
+
+    async def accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if peer_uid(writer) not in (None, os.getuid()):
+            print(f"Refusing follower connection from uid {peer_uid(writer)}")
+            writer.close()
+            return
+
+        peer = Peer(writer)
+        self.peers.append(peer)
+        peer.send(("tokens", set(self.tokens)))
+        # Sent even when empty: the follower is ready once it has the first state
+        peer.send(("state", dict(self.config.state)))
+
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message[0] == "token":
+                    self.add_token(message[1])
+                elif message[0] == "call":
+                    asyncio.ensure_future(self.answer(peer, *message[1:]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.peers.remove(peer)
+            peer.close()
+
+    async def answer(self, peer: Peer, request_id: int, method: str, args: tuple):
+        try:
+            if method not in RPC_METHODS:
+                raise ValueError(f"Unknown method: {method}")
+            peer.send(("reply", request_id, await getattr(self.config, method)(*args), None))
+        except Exception as e:
+            peer.send(("reply", request_id, None, str(e)))
+
+    def publish(self, new_model: Dict[str, Any], changed: Set[str]):
+        if not (self.enabled and self.runner and self.peers):
+            return
+
+        values = {key: new_model[key] for key in changed if key in new_model}
+        if values:
+            for peer in self.peers:
+                peer.send_state(values)
+
+    ##########################################################################
+    # FOLLOWER
+    ##########################################################################
+    async def follow(self, reader: asyncio.StreamReader, synced: asyncio.Future[None]):
+        for token in self.tokens:
+            write_frame(self.writer, ("token", token))
+
+        while True:
+            message = await read_frame(reader)
+            if message[0] == "state":
+                self.apply(message[1])
+                if not synced.done():
+                    synced.set_result(None)
+            elif message[0] == "tokens":
+                self.tokens.update(message[1])
+            elif message[0] == "token":
+                self.tokens.add(message[1])
+            elif message[0] == "reply":
+                _, request_id, result, error = message
+                reply = self.replies.pop(request_id, None)
+                if reply is not None and not reply.done():
+                    if error is not None:
+                        reply.set_exception(RuntimeError(error))
+                    else:
+                        reply.set_result(result)
+
+    def apply(self, values: Dict[str, Any]):
+        for value in values.values():
+            if isinstance(value, ImageRef):
+                image_repo.adopt(value)
+
+        with self.config.mutable() as m:
+            m.update(values)
+        # Values equal to the current (say None) ones change nothing, but are still loaded
+        for key in values:
+            self.config.settle(key)
+
+    async def call(self, method: str, *args: Any) -> Any:
+        """Run a Config method on the runner and return its result."""
+        if self.writer is None:
+            raise ConnectionError("Not connected to the runner")
+
+        request_id = next(self.request_ids)
+        reply = self.replies[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            write_frame(self.writer, ("call", request_id, method, args))
+            return await reply
+        finally:
+            self.replies.pop(request_id, None)
+
+    ##########################################################################
+    # SESSIONS
+    ##########################################################################
+    def add_token(self, token: str):
+        self.tokens.add(token)
+        if not self.enabled:
+            return
+
+        if self.runner:
+            for peer in self.peers:
+                peer.send(("token", token))
+        elif self.writer is not None:
+            write_frame(self.writer, ("token", token))
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+from typing import Any, Dict
+
+import yaml
+
+# Bumped whenever the compiled format changes, so stale caches are ignored
+COMPILE_VERSION = 2
+
+
+class OrderedLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader)):
+    """A safe loader that keeps mappings in file order, using libyaml when available."""
+
+
+def construct_ordered_mapping(loader, node):
+    return OrderedDict(loader.construct_pairs(node))
+
+
+OrderedLoader.add_constructor(yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, construct_ordered_mapping)
+
+
+def ordered_yaml_load(stream):
+    """Loads YAML while preserving key order."""
+    return yaml.load(stream, OrderedLoader)
+
+
+def cache_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.compiled.json")
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Load the config at `path`, from its compiled cache if the file hasn't changed.
+
+    The parsed config is stored as JSON next to the YAML, keyed by a hash of its
+    contents, so restarts and reloads of an unchanged file skip parsing it. Configs JSON
+    can't represent exactly (non-string keys, dates, ...) are never cached.
+
+    Only the parsed YAML is cached. Types, defaults and refs are resolved against the
+    classes registered in the running process, so `TypeRegistry.resolve` memoizes them
+    in memory instead."""
+    with open(path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+
+    compiled = cache_path(path)
+    try:
+        with open(compiled, "r") as f:
+            cached = json.load(f, object_pairs_hook=OrderedDict)
+        if cached["version"] == COMPILE_VERSION and cached["hash"] == digest:
+            return cached["config"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    config = ordered_yaml_load(source)
+    try:
+        data = json.dumps({"version": COMPILE_VERSION, "hash": digest, "config": config})
+    except (TypeError, ValueError):
+        return config
+    if json.loads(data, object_pairs_hook=OrderedDict)["config"] != config:
+        return config
+
+    try:
+        with open(compiled + ".tmp", "w") as f:
+            f.write(data)
+        os.replace(compiled + ".tmp", compiled)
+    except OSError as e:
+        print(f"Could not write compiled config to {compiled}: {e!r}")
+    return config
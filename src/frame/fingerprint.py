@@ -0,0 +1,71 @@
+import hashlib
+from typing import Any, Dict, Iterator, List, Tuple
+
+Path = Tuple[Any, ...]
+
+
+class Fingerprint:
+    """A structural digest of a value, computed once when the value is stored.
+
+    Values that compare equal (and have the same types) get equal digests, so a change
+    can be detected by comparing two short byte strings instead of two (possibly large)
+    nested values. The digests are blake2b, so unlike `hash()` an equal digest can be
+    trusted to mean an equal value. Dicts and lists keep the fingerprints of their
+    items, which `changed_paths` uses to find what changed inside."""
+
+    __slots__ = ("digest", "children")
+
+    def __init__(self, digest: bytes, children: Dict[Any, "Fingerprint"] | List["Fingerprint"] | None = None):
+        self.digest = digest
+        self.children = children
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Fingerprint) and self.digest == other.digest
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+
+def digest(*parts: bytes) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        # Length-prefixed, so the parts can't run into each other
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.digest()
+
+
+def fingerprint(value: Any) -> Fingerprint:
+    if isinstance(value, dict):
+        items = {key: fingerprint(item) for key, item in value.items()}
+        # Dict equality ignores order, so the digest must too
+        pairs = sorted(digest(fingerprint(key).digest, item.digest) for key, item in items.items())
+        return Fingerprint(digest(b"dict", *pairs), items)
+    if isinstance(value, (list, tuple)):
+        items = [fingerprint(item) for item in value]
+        return Fingerprint(digest(type(value).__qualname__.encode(), *(item.digest for item in items)), items)
+    if isinstance(value, (set, frozenset)):
+        return Fingerprint(digest(type(value).__qualname__.encode(), *sorted(fingerprint(item).digest for item in value)))
+    if isinstance(value, bytes):
+        return Fingerprint(digest(b"bytes", value))
+    if isinstance(value, str):
+        return Fingerprint(digest(b"str", value.encode("utf-8", "surrogatepass")))
+    return Fingerprint(digest(type(value).__qualname__.encode(), repr(value).encode("utf-8", "backslashreplace")))
+
+
+def changed_paths(old: Fingerprint | None, new: Fingerprint | None, path: Path = ()) -> Iterator[Path]:
+    """Yield the paths of the innermost items that differ between two fingerprints."""
+    if old is not None and new is not None and old.digest == new.digest:
+        return
+    if old is None or new is None or type(old.children) is not type(new.children) or new.children is None:
+        yield path
+    elif isinstance(new.children, dict):
+        for key in old.children.keys() | new.children.keys():
+            yield from changed_paths(old.children.get(key), new.children.get(key), path + (key,))
+    else:
+        for index in range(max(len(old.children), len(new.children))):
+            yield from changed_paths(
+                old.children[index] if index < len(old.children) else None,
+                new.children[index] if index < len(new.children) else None,
+                path + (index,),
+            )
@@ -0,0 +1,245 @@
+import asyncio
+from contextlib import ExitStack
+import json
+import time
+from typing import TYPE_CHECKING, Any, Dict, List
+
+import httpx
+
+from frame.actions import ActionBase, make_action
+from frame.images import ImageRef
+from frame.renderers import make_renderer
+from frame.utility import CoalescingQueue
+from frame.values import ValueBase, make_value
+
+if TYPE_CHECKING:
+    from frame.model import Config
+
+
+############################################################
+# Agent
+############################################################
+def encode_value(value: Any) -> Any:
+    if isinstance(value, ImageRef):
+        return {
+            "__image__": value.id,
+            "hash": value.hash,
+            "width": value.width,
+            "variants": {name: encode_value(variant) for name, variant in value.variants.items()},
+        }
+    return str(value)
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    return json.dumps(message, default=encode_value, separators=(",", ":")) + "\n"
+
+
+async def agent_stream(config: "Config", heartbeat: float = 15):
+    """Stream the model description, then the state, then changes as they happen, as JSON lines.
+
+    Changes are coalesced per property while the connection is backed up, so a slow
+    aggregator receives the latest values rather than a growing backlog."""
+    queue = CoalescingQueue()
+    with ExitStack() as stack, config.stream(queue, "agent"):
+        for property_name in config.get_properties():
+            stack.enter_context(config.subscribe_rendered_updates(property_name, queue))
+
+        yield encode_message(
+            {
+                "type": "model",
+                "name": config.project_name,
+                "properties": [
+                    {
+                        "name": name,
+                        "display_name": config.delegates[name].display_name,
+                        "renderer": config.delegates[name].desc.get("renderer", "string"),
+                    }
+                    for name in config.get_properties()
+                ],
+                "actions": [
+                    {
+                        "name": name,
+                        "display_name": config.actions[name].display_name,
+                        "renderer": config.actions[name].settings.get("renderer"),
+                    }
+                    for name in config.get_actions()
+                    if config.actions[name].renderer is not None
+                ],
+            }
+        )
+        yield encode_message({"type": "state", "ts": time.time(), "values": dict(config.state)})
+
+        while True:
+            try:
+                changed = await asyncio.wait_for(queue.get_all(), heartbeat)
+            except TimeoutError:
+                yield encode_message({"type": "ping", "ts": time.time()})
+                continue
+
+            if None in changed:
+                # The config was reloaded with other properties; the aggregator reconnects for the new model
+                return
+            yield encode_message({"type": "state", "ts": time.time(), "values": {name: config.state[name] for name in changed if name in config.state}})
+
+
+############################################################
+# Aggregator
+############################################################
+class RemoteAgent:
+    """A persistent connection to one agent's `/agent/stream`, reconnecting with backoff."""
+
+    properties: List[str]
+
+    def __init__(self, config: "Config", namespace: str, settings: Dict[str, Any]):
+        self.config = config
+        self.namespace = namespace
+        self.url = settings["url"].rstrip("/")
+        self.display_name = settings.get("name", namespace)
+        self.heartbeat = float(settings.get("heartbeat", 15))
+        self.max_delay = float(settings.get("max_reconnect_delay", 30))
+        self.client = httpx.AsyncClient(
+            base_url=self.url,
+            headers={"Authorization": f"Bearer {settings['token']}"},
+            timeout=float(settings.get("timeout", 10)),
+        )
+        self.properties = []
+        self.connected = False
+        self.reconnects = 0
+        self.lag = 0.0
+        self.described: asyncio.Future[None] | None = None
+        self.task: asyncio.Task[None] | None = None
+
+    def start(self) -> asyncio.Future[None]:
+        self.described = asyncio.get_running_loop().create_future()
+        self.task = asyncio.ensure_future(self.run())
+        return self.described
+
+    async def run(self):
+        delay = 1.0
+        while True:
+            try:
+                timeout = httpx.Timeout(self.client.timeout.connect, read=self.heartbeat * 3)
+                async with self.client.stream("GET", "/agent/stream", params={"heartbeat": self.heartbeat}, timeout=timeout) as response:
+                    response.raise_for_status()
+                    self.connected = True
+                    delay = 1.0
+                    async for line in response.aiter_lines():
+                        if line:
+                            self.handle(json.loads(line, object_hook=self.decode))
+            except Exception as e:
+                # Anything from a dropped connection to a malformed message: reconnect and start over
+                print(f"Agent {self.namespace} ({self.url}): {e!r}")
+
+            if self.connected:
+                self.connected = False
+                self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
+
+    def decode(self, value: Dict[str, Any]) -> Any:
+        if "__image__" not in value:
+            return value
+
+        ref = ImageRef(value["__image__"], "", value["hash"])
+        ref.url = f"fleet/{self.namespace}/images/{ref.id}"
+        ref.width = value["width"]
+        ref.variants = value["variants"]
+        return ref
+
+    def handle(self, message: Dict[str, Any]):
+        if message["type"] == "model":
+            self.describe(message)
+        elif message["type"] == "state":
+            self.lag = time.time() - message["ts"]
+            names = [f"{self.namespace}.{name}" for name in message["values"]]
+            with self.config.mutable() as m:
+                for name, value in zip(names, message["values"].values()):
+                    if name in m:
+                        m[name] = value
+            for name in names:
+                if name in self.config.delegates:
+                    self.config.settle(name)
+
+    def describe(self, message: Dict[str, Any]):
+        for desc in message["properties"]:
+            name = f"{self.namespace}.{desc['name']}"
+            if name not in self.config.delegates:
+                value_desc = {
+                    "name": f"{self.display_name}: {desc['display_name']}",
+                    "renderer": desc["renderer"],
+                    "get": {"type": "remote"},
+                }
+                self.config.add_property(name, make_value(name, value_desc, self.config))
+                self.properties.append(name)
+
+        for desc in message["actions"]:
+            name = f"{self.namespace}.{desc['name']}"
+            if name not in self.config.actions:
+                settings = {"type": "remote", "agent": self.namespace, "action": desc["name"], "renderer": desc["renderer"]}
+                action = make_action(self.config, name, settings)
+                action.display_name = f"{self.display_name}: {desc['display_name']}"
+                self.config.add_action(name, action)
+
+        if not self.described.done():
+            self.described.set_result(None)
+
+    async def do(self, action_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.client.post(f"/agent/action/{action_name}", json=params, timeout=None)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_image(self, image_name: str, headers: Dict[str, str]) -> httpx.Response:
+        request = self.client.build_request("GET", f"/agent/images/{image_name}", headers=headers)
+        return await self.client.send(request, stream=True)
+
+
+class Fleet:
+    """Merges the models of several remote agents into this Config under `<namespace>.<name>`.
+
+    Configured under `settings.fleet.agents`, e.g.
+    `liverpool: {url: http://10.0.0.5:8000, token: ...}`; each agent needs the same
+    token under its own `settings.agent.token`."""
+
+    agents: Dict[str, RemoteAgent]
+
+    def __init__(self, config: "Config", settings: Dict[str, Any]):
+        self.config = config
+        self.timeout = float(settings.get("timeout", 5))
+        self.agents = {namespace: RemoteAgent(config, namespace, agent_settings) for namespace, agent_settings in settings.get("agents", {}).items()}
+
+    async def start(self):
+        """Connect to every agent, waiting up to `timeout` for their models to arrive."""
+        if self.agents:
+            await asyncio.wait([agent.start() for agent in self.agents.values()], timeout=self.timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {namespace: {"connected": agent.connected, "reconnects": agent.reconnects, "lag": agent.lag, "properties": len(agent.properties)} for namespace, agent in self.agents.items()}
+
+
+class RemoteValue(ValueBase, name="remote"):
+    """Pushed by a RemoteAgent; polling just returns the last value received."""
+
+    def __init__(self, settings, config, name):
+        super().__init__(settings)
+        self.config = config
+        self.property_name = name
+
+    async def get(self):
+        return self.config.state.get(self.property_name)
+
+
+class RemoteAction(ActionBase, name="remote"):
+    def __init__(self, settings: Dict[str, Any], config: "Config"):
+        super().__init__(settings)
+        self.config = config
+        self.agent = settings["agent"]
+        self.action = settings["action"]
+
+        if settings.get("renderer"):
+            self.renderer, _ = make_renderer(settings["renderer"])
+
+    async def call(self, params: Dict[str, Any], get_action) -> Any:
+        job = await self.config.fleet.agents[self.agent].do(self.action, params)
+        if job["status"] != "done":
+            raise RuntimeError(job["error"] or job["status"])
+        return job["result"]
@@ -0,0 +1,127 @@
+from array import array
+import math
+import re
+import time
+from typing import Any, Dict, List
+
+RESOLUTIONS = {"raw": 0, "minute": 60, "hour": 3600}
+NUMBER = re.compile(r"\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?")
+
+
+def numeric(value: Any) -> float | None:
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        # Leading number only, so shell output like "12.5%" or "0.42 load" still counts
+        match = NUMBER.match(value)
+        return float(match.group()) if match else None
+    return None
+
+
+class Ring:
+    """A fixed-capacity ring of float rows, stored column-wise in `array('d')`."""
+
+    def __init__(self, capacity: int, columns: List[str]):
+        self.capacity = capacity
+        self.columns = {column: array("d", bytes(8 * capacity)) for column in columns}
+        self.head = 0
+        self.count = 0
+
+    def append(self, *row: float):
+        for column, value in zip(self.columns.values(), row):
+            column[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def rows(self, since: float = 0) -> Dict[str, List[float]]:
+        """Rows in time order, as one list per column; the first column is the time."""
+        start = (self.head - self.count) % self.capacity
+        order = [(start + i) % self.capacity for i in range(self.count)]
+        times = next(iter(self.columns.values()))
+        order = [i for i in order if times[i] >= since]
+        return {name: [column[i] for i in order] for name, column in self.columns.items()}
+
+
+class Bucket:
+    """Running min / max / average over one downsampling interval."""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.min = math.inf
+        self.max = -math.inf
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value: float):
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.total += value
+        self.count += 1
+
+    def row(self) -> tuple[float, float, float, float]:
+        return (self.start, self.min, self.max, self.total / self.count)
+
+
+class History:
+    """Samples of one numeric property at several resolutions, in bounded memory.
+
+    Raw samples are kept as they arrive; minute and hour rings keep min / max / average
+    per interval. Configured per property as `history: true` or e.g.
+    `history: {raw: 3600, minute: 1440, hour: 720, key: load}`, where `key` picks a field
+    out of dict values. Non-numeric values are ignored."""
+
+    def __init__(self, settings: Dict[str, Any] | bool):
+        settings = settings if isinstance(settings, dict) else {}
+        self.key = settings.get("key")
+        self.raw = Ring(int(settings.get("raw", 3600)), ["time", "value"])
+        self.rings = {
+            "minute": Ring(int(settings.get("minute", 24 * 60)), ["time", "min", "max", "avg"]),
+            "hour": Ring(int(settings.get("hour", 30 * 24)), ["time", "min", "max", "avg"]),
+        }
+        self.buckets: Dict[str, Bucket] = {}
+        self.last: float | None = None
+
+    def add(self, value: Any, now: float | None = None):
+        if self.key is not None and isinstance(value, dict):
+            value = value.get(self.key)
+        value = numeric(value)
+        if value is None or math.isnan(value):
+            return
+
+        now = time.time() if now is None else now
+        self.raw.append(now, value)
+        for resolution, ring in self.rings.items():
+            self.add_to_bucket(resolution, ring, value, now)
+        self.last = value
+
+    def add_to_bucket(self, resolution: str, ring: Ring, value: float, now: float):
+        interval = RESOLUTIONS[resolution]
+        start = now - now % interval
+        bucket = self.buckets.get(resolution)
+        if bucket is not None and bucket.start != start:
+            ring.append(*bucket.row())
+            # Values are sampled on change, so an interval without samples held the last value
+            gaps = min(int((start - bucket.start) / interval) - 1, ring.capacity)
+            for i in range(gaps):
+                gap_start = start - (gaps - i) * interval
+                ring.append(gap_start, self.last, self.last, self.last)
+            bucket = None
+        if bucket is None:
+            bucket = self.buckets[resolution] = Bucket(start)
+        bucket.add(value)
+
+    def query(self, resolution: str = "raw", since: float = 0) -> Dict[str, Any]:
+        if resolution == "raw":
+            return {"resolution": resolution, **self.raw.rows(since)}
+        if resolution not in self.rings:
+            raise ValueError(f"Unknown resolution: {resolution}")
+
+        rows = self.rings[resolution].rows(since)
+        # Include the interval in progress, so the newest samples always show up
+        bucket = self.buckets.get(resolution)
+        if bucket is not None and bucket.start >= since:
+            for name, value in zip(rows, bucket.row()):
+                rows[name].append(value)
+        return {"resolution": resolution, **rows}
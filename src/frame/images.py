@@ -1,49 +1,225 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import os
-from typing import Any, Dict
+import shutil
+import subprocess
+from typing import Any, Callable, Dict, Iterable, Set
 import tempfile
-import uuid
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+FORMAT_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp", "png": ".png"}
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 class ImageRef:
+    """A stored image. Refs created by `ImageRepo.add_file` are content-addressed, so
+    two captures with identical bytes produce equal refs with the same URL."""
+
     id: str
-    uid: str
-    mod_time: float
+    hash: str | None
 
-    def __init__(self, id: str, path: str):
+    def __init__(self, id: str, path: str, hash: str | None = None):
         self.id = id
         self.path = path
         self.url = "images/" + id
-        self.uid = uuid.uuid4().hex
+        self.hash = hash
+        self.width: int | None = None
+        self.size = 0
+        self.owned = True
+        self.parent: ImageRef | None = None
+        self.variants: Dict[str, ImageRef] = {}
 
     @property
     def extension(self):
         return os.path.splitext(self.path)[1]
 
+    @property
+    def etag(self) -> str | None:
+        return f'"{self.hash}"' if self.hash else None
+
     def __eq__(self, other) -> bool:
-        return type(self) is type(other) and self.id == other.id and self.uid == other.uid
+        return type(self) is type(other) and self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+
+def encode_variant(source_path: str, dest_path: str, encoder: str, spec: Dict[str, Any]):
+    """Write a resized / re-encoded copy of `source_path`. Blocking."""
+    format = spec.get("format", "jpeg")
+    width = spec.get("width")
+    quality = int(spec.get("quality", 75))
+
+    if encoder == "pillow":
+        with Image.open(source_path) as image:
+            if width and image.width > width:
+                image.thumbnail((int(width), image.height))
+            if format == "jpeg":
+                image = image.convert("RGB")
+            image.save(dest_path, format=format.upper(), quality=quality)
+    else:
+        command = ["sips", "-s", "format", format, "-s", "formatOptions", str(quality)]
+        if width:
+            command += ["--resampleWidth", str(width)]
+        subprocess.run([*command, source_path, "--out", dest_path], check=True, capture_output=True)
 
 
 class ImageRepo:
+    """Stores captured images, plus downscaled / re-encoded variants of each.
+
+    Variants are configured under `settings.images.variants`, e.g.
+    `thumbnail: {width: 480, format: webp, quality: 70}`, and are encoded with Pillow
+    when installed or macOS `sips` otherwise.
+
+    The store is bounded by `max_bytes`; the least recently served images are evicted
+    first, and only images the repo created can be looked up."""
+
     def __init__(self, settings: Dict[str, Any]):
-        self.settings = settings
         self.dir = tempfile.TemporaryDirectory()
-        self.images: Dict[str, ImageRef] = {}
+        self.images: OrderedDict[str, ImageRef] = OrderedDict()
+        self.pool: ThreadPoolExecutor | None = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # The images currently in use (set by the Config to those in its state), never evicted
+        self.in_use: Callable[[], Iterable[ImageRef]] = lambda: ()
+        self.configure(settings)
+
+    def configure(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.variants: Dict[str, Dict[str, Any]] = settings.get("variants", {"thumbnail": {"width": 480, "format": "jpeg", "quality": 70}})
+        self.encoder = settings.get("encoder") or ("pillow" if Image is not None else "sips" if shutil.which("sips") else None)
+        self.workers = int(settings.get("workers", 2))
+        self.max_bytes = int(settings.get("max_bytes", 256 * 1024 * 1024))
 
-    def make_image_ref(self, unique_id: str) -> ImageRef:
-        path = os.path.join(self.dir.name, unique_id)
-        ref = ImageRef(unique_id, path)
-        self.images[unique_id] = ref
+    def scratch_path(self, name: str) -> str:
+        """A path inside the repo to capture into before calling `add_file`."""
+        return os.path.join(self.dir.name, f"scratch-{name}")
+
+    def add_file(self, source_path: str) -> ImageRef:
+        """Move `source_path` into the repo under the hash of its contents.
+
+        Blocking: hashes the whole file, so call it from a worker thread."""
+        digest = hash_file(source_path)
+        id = digest + os.path.splitext(source_path)[1]
+
+        ref = self.images.get(id)
+        if ref is not None:
+            os.remove(source_path)
+            self.images.move_to_end(id)
+            return ref
+
+        path = os.path.join(self.dir.name, id)
+        os.replace(source_path, path)
+        ref = ImageRef(id, path, digest)
+        self.store(ref)
         return ref
 
-    def get_image_ref(self, id: str) -> ImageRef:
+    def store(self, ref: ImageRef):
+        ref.size = os.path.getsize(ref.path)
+        self.images[ref.id] = ref
+        self.size += ref.size
+        self.evict(keep=ref)
+
+    def adopt(self, ref: ImageRef):
+        """Serve an image stored by another process (see `Cluster`) without taking ownership of its file."""
+        if ref.id in self.images:
+            return
+        for image in [ref, *ref.variants.values()]:
+            image.owned = False
+            self.images[image.id] = image
+            self.size += image.size
+        self.evict(keep=ref)
+
+    def evict(self, keep: ImageRef | None = None):
+        if self.size <= self.max_bytes:
+            return
+
+        keep_ids: Set[str] = set()
+        for ref in [keep, *self.in_use()]:
+            if ref is not None:
+                keep_ids.update(image.id for image in [ref, ref.parent, *ref.variants.values()] if image is not None)
+
+        for id in list(self.images.keys()):
+            if self.size <= self.max_bytes:
+                break
+            if id in keep_ids or id not in self.images:
+                continue
+            self.discard(id)
+            self.evictions += 1
+
+    async def make_variants(self, ref: ImageRef):
+        if self.encoder is None or ref.hash is None:
+            return
+
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="frame-images")
+
+        async def make_variant(name: str, spec: Dict[str, Any]):
+            id = f"{ref.hash}.{name}{FORMAT_EXTENSIONS.get(spec.get('format', 'jpeg'), '.img')}"
+            path = os.path.join(self.dir.name, id)
+            try:
+                await asyncio.get_running_loop().run_in_executor(self.pool, encode_variant, ref.path, path, self.encoder, spec)
+            except Exception as e:
+                print(f"Error making {name} variant of {ref.id}: {e}")
+                return
+
+            variant = ImageRef(id, path, f"{ref.hash}.{name}")
+            variant.width = spec.get("width")
+            variant.parent = ref
+            ref.variants[name] = variant
+            self.store(variant)
+
+        await asyncio.gather(*[make_variant(name, spec) for name, spec in self.variants.items() if name not in ref.variants])
+
+    def discard(self, id: str):
+        ref = self.images.pop(id, None)
+        if ref is None:
+            return
+
+        self.size -= ref.size
+        for variant in list(ref.variants.values()):
+            self.discard(variant.id)
+        if ref.parent is not None:
+            ref.parent.variants = {name: variant for name, variant in ref.parent.variants.items() if variant is not ref}
+        if ref.owned and os.path.exists(ref.path):
+            os.remove(ref.path)
+
+    def get_image_ref(self, id: str) -> ImageRef | None:
+        """Look up a stored image, marking it as recently used. Unknown ids return None."""
         image = self.images.get(id)
         if image is None:
-            return self.make_image_ref(id)
+            self.misses += 1
         else:
-            return image
+            self.hits += 1
+            self.images.move_to_end(id)
+        return image
 
-    def get_image_path(self, id: str) -> str:
-        return self.get_image_ref(id).path
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            "images": len(self.images),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else None,
+            "evictions": self.evictions,
+        }
 
 
 image_repo = ImageRepo({})
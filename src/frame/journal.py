@@ -0,0 +1,169 @@
+from bisect import bisect_right
+from concurrent.futures import Future
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Set
+
+from frame.actions import Job
+from frame.fleet import encode_message
+from frame.writers import file_writers
+
+if TYPE_CHECKING:
+    from frame.model import Config
+
+
+class Journal:
+    """An append-only record of state changes and action calls, as JSON lines.
+
+    Writes go through the shared writer thread, so the event loop never waits on disk.
+    The journal is split into segments of about `segment_bytes`, each starting with a
+    checkpoint of the full state, so replaying to any time only reads one segment.
+    `index.jsonl` lists every segment with its start time, plus a (time, offset) entry
+    every `index_bytes` for seeking within a segment. Only the runner writes.
+
+    Creating the directory and pruning old segments also run on the writer thread, in
+    order with the writes."""
+
+    def __init__(self, config: "Config", settings: Dict[str, Any]):
+        self.config = config
+        self.directory = settings.get("path")
+        self.segment_bytes = int(settings.get("segment_bytes", 8 * 1024 * 1024))
+        self.index_bytes = int(settings.get("index_bytes", 64 * 1024))
+        self.keep = int(settings.get("keep", 32))
+        self.writer_settings = {"flush_interval": float(settings.get("flush_interval", 1.0)), "fsync_interval": settings.get("fsync_interval")}
+        self.segment: str | None = None
+        self.segment_size = 0
+        self.indexed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def start(self):
+        if self.enabled and self.segment is None:
+            file_writers.call(lambda: os.makedirs(self.directory, exist_ok=True))
+            file_writers.configure(self.path("index.jsonl"), self.writer_settings)
+            self.open_segment()
+            self.config.executor.listeners.append(self.record_job)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def open_segment(self):
+        now = time.time()
+        if self.segment is not None:
+            file_writers.release(self.path(self.segment))
+        self.segment = f"segment-{int(now * 1000):013d}.jsonl"
+        self.segment_size = 0
+        self.indexed = 0
+        file_writers.configure(self.path(self.segment), self.writer_settings)
+        file_writers.write(self.path("index.jsonl"), encode_message({"segment": self.segment, "t": now}))
+        self.append({"t": now, "kind": "checkpoint", "state": self.config.state})
+        file_writers.call(lambda segment=self.segment: self.prune(segment))
+
+    def prune(self, current: str):
+        """Remove all but the newest `keep` segments and their index entries. Runs on the writer thread."""
+        # The current segment's file may not have been flushed into existence yet
+        segments = sorted({name for name in os.listdir(self.directory) if name.startswith("segment-")} | {current})
+        removed = set(segments[: max(0, len(segments) - self.keep)])
+        if not removed:
+            return
+        for name in removed:
+            if os.path.exists(self.path(name)):
+                os.remove(self.path(name))
+
+        index = file_writers.writer(self.path("index.jsonl"))
+        index.flush()
+        with open(index.path) as f:
+            lines = [line for line in f if line.endswith("\n") and json.loads(line)["segment"] not in removed]
+        index.overwrite("".join(lines), Future())
+
+    def append(self, record: Dict[str, Any]):
+        line = encode_message(record)
+        if self.segment_size - self.indexed >= self.index_bytes:
+            file_writers.write(self.path("index.jsonl"), encode_message({"segment": self.segment, "t": record["t"], "offset": self.segment_size}))
+            self.indexed = self.segment_size
+        file_writers.write(self.path(self.segment), line)
+        self.segment_size += len(line.encode())
+
+        if self.segment_size >= self.segment_bytes:
+            self.open_segment()
+
+    def record_state(self, new_model: Dict[str, Any], changed: Set[str]):
+        if self.segment is None:
+            return
+        values = {key: new_model[key] for key in changed if key in new_model}
+        if values:
+            self.append({"t": time.time(), "kind": "state", "values": values})
+
+    def record_job(self, event: str, job: Job):
+        record = {"t": time.time(), "kind": "action", "event": event, "job": job.id, "action": job.action_name}
+        if event == "submitted":
+            record["params"] = job.params
+        else:
+            record.update(status=job.status, error=job.error, duration=job.finished - (job.started or job.created))
+        self.append(record)
+
+
+############################################################
+# Reading
+############################################################
+class JournalReader:
+    """Time-range queries and state replay over a journal directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.segments: List[str] = []
+        self.starts: List[float] = []
+        self.offsets: Dict[str, List[tuple[float, int]]] = {}
+
+        with open(os.path.join(directory, "index.jsonl")) as f:
+            for line in f:
+                entry = json.loads(line)
+                if not os.path.exists(os.path.join(directory, entry["segment"])):
+                    continue
+                if "offset" in entry:
+                    self.offsets[entry["segment"]].append((entry["t"], entry["offset"]))
+                else:
+                    self.segments.append(entry["segment"])
+                    self.starts.append(entry["t"])
+                    self.offsets[entry["segment"]] = []
+
+    def read_segment(self, segment: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        with open(os.path.join(self.directory, segment), "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if line.endswith(b"\n"):
+                    yield json.loads(line)
+
+    def records(self, since: float = 0, until: float = float("inf")) -> Iterator[Dict[str, Any]]:
+        """Every record with `since` <= t <= `until`, in order."""
+        first = max(0, bisect_right(self.starts, since) - 1)
+        for i in range(first, len(self.segments)):
+            if self.starts[i] > until:
+                return
+            segment = self.segments[i]
+            offsets = self.offsets[segment]
+            seek = bisect_right(offsets, (since, float("inf")))
+            for record in self.read_segment(segment, offsets[seek - 1][1] if seek > 0 else 0):
+                if record["t"] > until:
+                    return
+                if record["t"] >= since and record["kind"] != "checkpoint":
+                    yield record
+
+    def state_at(self, t: float) -> Dict[str, Any]:
+        """The state as it was at time `t`: the segment's checkpoint plus every change up to `t`."""
+        i = bisect_right(self.starts, t) - 1
+        if i < 0:
+            return {}
+
+        state: Dict[str, Any] = {}
+        for record in self.read_segment(self.segments[i]):
+            if record["t"] > t:
+                break
+            if record["kind"] == "checkpoint":
+                state = dict(record["state"])
+            elif record["kind"] == "state":
+                state.update(record["values"])
+        return state
@@ -1,31 +1,30 @@
-from functools import wraps
+from contextlib import asynccontextmanager
 import hashlib
-import json
 from typing import Any, Dict
-from uuid import uuid4
 from fastapi import FastAPI, Form, Request, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
-import yaml
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
+from frame.config import load_config
 from frame.model import Config
 import asyncio
 from fastapi.responses import StreamingResponse
+from frame.fleet import agent_stream
+from frame.history import RESOLUTIONS
 from frame.images import image_repo
+from frame.metrics import metrics
+from frame.profiler import collapse, sample_stacks
+from frame.watchdog import loop_monitor
+from frame.writers import file_writers
 
-from collections import OrderedDict
 
-from frame.renderers import render_action, render_simple_value
+from frame.renderers import render_action, render_nested
 from fastapi.responses import FileResponse
 import os
-from fastapi import Body
-from fastapi import Depends, HTTPException, status, Security
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, OAuth2PasswordBearer
-from datetime import datetime, timedelta
+import resource
+import sys
+import threading
+from fastapi import Depends, HTTPException, status
 import secrets
-from pydantic import BaseModel
-
-
-
-TOKENS = set()
+from starlette.background import BackgroundTask
 
 
 # --- Helper functions ---
@@ -37,22 +36,25 @@ def verify_password(plain_password: str, hashed_password: str):
     return hash_password(plain_password) == hashed_password
 
 
-def ordered_yaml_load(stream):
-    """Loads YAML while preserving key order."""
-
-    class OrderedLoader(yaml.SafeLoader):
-        pass
+# Loaded by `lifespan` before the first request
+config: Config = None  # type: ignore[assignment]
 
-    def construct_ordered_mapping(loader, node):
-        return OrderedDict(loader.construct_pairs(node))
 
-    OrderedLoader.add_constructor(yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, construct_ordered_mapping)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Values are fetched in the background: every route answers as soon as the config is parsed
+    global config
+    path = os.environ.get("FRAME_CONFIG", "src/frame/examples/example_config.yaml")
+    config = Config(load_config(path), config_path=path)
+    config.done()
+    yield
+    # uvicorn re-raises SIGTERM after shutdown, so atexit handlers never run
+    config.snapshot.save()
+    file_writers.close()
+    loop_monitor.stop()
 
-    return yaml.load(stream, OrderedLoader)
 
-
-app = FastAPI()
-config = Config(ordered_yaml_load(open("src/frame/examples/example_config.yaml")))
+app = FastAPI(lifespan=lifespan)
 
 
 # --- Login Page ---
@@ -86,7 +88,7 @@ async def login(response: Response, password: str = Form(...)):
     if hashlib.sha256(password.encode()).hexdigest() != config.password_hash:
         raise HTTPException(status_code=401, detail="Incorrect password")
     token = secrets.token_urlsafe(32)
-    TOKENS.add(token)
+    config.cluster.add_token(token)
     # Set token in an HTTP-only cookie
     response = RedirectResponse("/", status_code=302)
     response.set_cookie("auth_token", token, httponly=True)
@@ -96,81 +98,149 @@ async def login(response: Response, password: str = Form(...)):
 # Dependency to check token in cookie
 async def verify_token_redirect(request: Request):
     token = request.cookies.get("auth_token")
-    if not token or token not in TOKENS:
+    if not token or token not in config.cluster.tokens:
         raise HTTPException(status_code=status.HTTP_302_FOUND, headers={"Location": "/login"})
 
+
 # Dependency to check token in cookie
 async def verify_token_fail(request: Request):
     token = request.cookies.get("auth_token")
-    if not token or token not in TOKENS:
+    if not token or token not in config.cluster.tokens:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
 
-def make_endpoints():
-    endpoints_future = asyncio.Future[list[Dict[str, Any]]]()
-    actions_future = asyncio.Future[list[Dict[str, Any]]]()
 
-    def make(_):
-        endpoints: list[Dict[str, Any]] = []
+# Dependency to check the bearer token an aggregator uses to reach this agent
+async def verify_agent_token(request: Request):
+    token = config.settings.get("agent", {}).get("token")
+    if not token or not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
 
-        for property_name in config.get_properties():
-            property = config.get_property(property_name)
 
-            endpoint_path = config.get_property_path(property_name)
+# Dependency for debug endpoints: a logged-in browser, or a scraper using the agent token
+async def verify_debug_token(request: Request):
+    try:
+        await verify_token_fail(request)
+    except HTTPException:
+        await verify_agent_token(request)
 
-            @app.get(endpoint_path, response_class=HTMLResponse)
-            async def get_property_value(property_name=property_name):
-                queue = asyncio.Queue[Any]()
-                with config.subscribe_rendered_updates(property_name, queue) as sub:
-                    _, rendered = await queue.get()
-                    return rendered
 
-            if property.update_time:
-                config.auto_update(property_name, property.update_time)
+@app.get("/model/{property_path:path}/history")
+async def get_property_history(
+    property_path: str,
+    resolution: str = "raw",
+    since: float = 0,
+    _=Depends(verify_token_fail),
+):
+    property = config.delegates.get(property_path.replace("/", "."))
+    if property is None or property.history is None:
+        raise HTTPException(status_code=404, detail="No history for this property")
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown resolution: {resolution}")
+    return property.history.query(resolution, since)
+
+
+@app.get("/model/{property_path:path}", response_class=HTMLResponse)
+async def get_property_value(property_path: str):
+    property_name = property_path.replace("/", ".")
+    if property_name not in config.delegates:
+        raise HTTPException(status_code=404, detail=f"Unknown property: {property_name}")
+
+    try:
+        await asyncio.wait_for(config.pull(property_name), config.delegates[property_name].timeout or config.startup_timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Timed out fetching {property_name}")
+    return await config.get_rendered(property_name)
+
+
+@app.get("/updates")
+async def get_rendered_update_stream(_=Depends(verify_token_fail)):
+    return StreamingResponse(
+        config.get_rendered_update_stream(),
+        media_type="text/event-stream",
+    )
+
+
+@app.post("/action/{action_name}", response_class=HTMLResponse)
+async def do_action(
+    action_name: str,
+    params: Dict[str, Any] = {},
+    _=Depends(verify_token_redirect),
+):
+    if action_name not in config.actions:
+        raise HTTPException(status_code=404, detail=f"Unknown action: {action_name}")
+
+    job = await config.do(action_name, params or {})
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    elif job.status != "done":
+        return f"<div class='value failure'>{job.status.capitalize()}</div>"
+    elif job.result is None or isinstance(job.result, str):
+        return job.result
+    return render_nested(job.result)
+
+
+@app.post("/action/{action_name}/jobs", status_code=202)
+async def submit_action(
+    action_name: str,
+    params: Dict[str, Any] = {},
+    _=Depends(verify_token_fail),
+):
+    if action_name not in config.actions:
+        raise HTTPException(status_code=404, detail=f"Unknown action: {action_name}")
 
-            # Add to list of endpoints
-            endpoints.append(
-                {
-                    "path": endpoint_path,
-                    "name": property.display_name,
-                    "render_func": property.renderer.render_list_item,
-                }
-            )
+    return (await config.submit(action_name, params or {})).to_dict()
 
-        @app.get("/updates")
-        async def get_rendered_update_stream(_=Depends(verify_token_fail)):
-            return StreamingResponse(
-                config.get_rendered_update_stream(),
-                media_type="text/event-stream",
-            )
 
-        endpoints_future.set_result(endpoints)
+@app.get("/debug/metrics", response_class=PlainTextResponse)
+async def get_metrics(
+    _=Depends(verify_debug_token),
+):
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-        actions: list[Dict[str, Any]] = []
 
-        @app.post("/action/{action_name}", response_class=HTMLResponse)
-        async def do_action(
-            action_name: str,
-            params: Dict[str, Any] = {},
-            _=Depends(verify_token_redirect),
-        ):
-            params_to_use = params or {}
-            return await config.do(action_name, params_to_use)
+@app.get("/debug/loop")
+async def get_loop_stats(
+    _=Depends(verify_debug_token),
+):
+    return loop_monitor.stats()
 
-        for action_name in config.get_actions():
-            rendered = config.get_rendered_action(action_name)
 
-            if rendered:
-                action_path = f"/action/{action_name}"
-                actions.append({"rendered": rendered, "render_func": render_action, "name": action_name, "path": action_path})
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def get_profile(
+    seconds: float = 5,
+    hz: float = 200,
+    all_threads: bool = False,
+    _=Depends(verify_debug_token),
+):
+    """Sample the running process and return collapsed stacks, e.g. for flamegraph.pl or speedscope."""
+    thread_ids = None if all_threads else [threading.get_ident()]
+    counts = await asyncio.to_thread(sample_stacks, min(max(seconds, 0.1), 60), 1 / min(max(hz, 1), 1000), thread_ids)
+    return PlainTextResponse(collapse(counts))
 
-        actions_future.set_result(actions)
 
-    config.done().add_done_callback(make)
+def get_endpoints() -> list[Dict[str, Any]]:
+    endpoints: list[Dict[str, Any]] = []
+    for property_name in config.get_properties():
+        property = config.get_property(property_name)
+        endpoints.append(
+            {
+                "path": config.get_property_path(property_name),
+                "name": property.display_name,
+                "render_func": property.renderer.render_list_item,
+            }
+        )
+    return endpoints
 
-    return endpoints_future, actions_future
 
+def get_action_endpoints() -> list[Dict[str, Any]]:
+    actions: list[Dict[str, Any]] = []
+    for action_name in config.get_actions():
+        rendered = config.get_rendered_action(action_name)
 
-endpoints_future, actions_future = make_endpoints()
+        if rendered:
+            action_path = f"/action/{action_name}"
+            actions.append({"rendered": rendered, "render_func": render_action, "name": action_name, "path": action_path})
+    return actions
 
 
 @app.get("/style.css")
@@ -187,15 +257,21 @@ async def get_script(
     return FileResponse("src/frame/static/script.js", media_type="text/javascript")
 
 
-@app.get("/images/{image_name}")
-async def get_image(
-    image_name: str,
-    _=Depends(verify_token_redirect),
-):
-    # Define directory where images are stored
-    image_path = image_repo.get_image_path(image_name)
+def image_response(image_name: str, request: Request) -> Response:
+    image_ref = image_repo.get_image_ref(image_name)
+    if image_ref is None:
+        raise HTTPException(status_code=404, detail="Unknown image")
+    image_path = image_ref.path
     extension = os.path.splitext(image_path)[1]
 
+    # Content-addressed images never change, so clients may cache them indefinitely
+    headers = {}
+    if image_ref.etag:
+        headers = {"Cache-Control": "private, max-age=31536000, immutable", "ETag": image_ref.etag}
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match.strip() == "*" or image_ref.etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
     # Determine content type based on file extension
     content_types = {
         ".jpg": "image/jpeg",
@@ -206,7 +282,122 @@ async def get_image(
         ".webp": "image/webp",
     }
 
-    return FileResponse(image_path, media_type=content_types.get(extension, "application/octet-stream"))
+    # FileResponse handles Range / If-Range, and hands the path to the server for
+    # zero-copy sending when it supports the http.response.pathsend extension
+    return FileResponse(image_path, media_type=content_types.get(extension, "application/octet-stream"), headers=headers)
+
+
+@app.get("/images/{image_name}")
+async def get_image(
+    image_name: str,
+    request: Request,
+    _=Depends(verify_token_redirect),
+):
+    return image_response(image_name, request)
+
+
+@app.get("/debug/images")
+async def get_image_stats(
+    _=Depends(verify_token_fail),
+):
+    return image_repo.stats()
+
+
+@app.get("/debug/process")
+async def get_process_stats(
+    _=Depends(verify_token_fail),
+):
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS but kilobytes on Linux
+    return {"cpu": usage.ru_utime + usage.ru_stime, "max_rss": usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)}
+
+
+@app.get("/jobs")
+async def get_jobs(
+    _=Depends(verify_token_fail),
+):
+    return [job.to_dict() for job in await config.get_jobs()]
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = 0,
+    _=Depends(verify_token_fail),
+):
+    job = await config.get_job(job_id, min(wait, 60))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(
+    job_id: str,
+    _=Depends(verify_token_fail),
+):
+    job = await config.cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+
+@app.get("/agent/stream")
+async def get_agent_stream(
+    heartbeat: float = 15,
+    _=Depends(verify_agent_token),
+):
+    return StreamingResponse(agent_stream(config, max(heartbeat, 1)), media_type="application/x-ndjson")
+
+
+@app.post("/agent/action/{action_name}")
+async def do_agent_action(
+    action_name: str,
+    params: Dict[str, Any] = {},
+    _=Depends(verify_agent_token),
+):
+    if action_name not in config.actions:
+        raise HTTPException(status_code=404, detail=f"Unknown action: {action_name}")
+    return (await config.do(action_name, params or {})).to_dict()
+
+
+@app.get("/agent/images/{image_name}")
+async def get_agent_image(
+    image_name: str,
+    request: Request,
+    _=Depends(verify_agent_token),
+):
+    return image_response(image_name, request)
+
+
+@app.get("/fleet/{namespace}/images/{image_name}")
+async def get_fleet_image(
+    namespace: str,
+    image_name: str,
+    request: Request,
+    _=Depends(verify_token_redirect),
+):
+    agent = config.fleet.agents.get(namespace)
+    if agent is None:
+        raise HTTPException(status_code=404, detail="Unknown agent")
+
+    forwarded = {name: request.headers[name] for name in ("if-none-match", "range") if name in request.headers}
+    response = await agent.get_image(image_name, forwarded)
+    headers = {name: response.headers[name] for name in ("etag", "cache-control", "content-range", "content-length") if name in response.headers}
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=headers,
+        media_type=response.headers.get("content-type"),
+        background=BackgroundTask(response.aclose),
+    )
+
+
+@app.get("/debug/fleet")
+async def get_fleet_stats(
+    _=Depends(verify_token_fail),
+):
+    return config.fleet.stats()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -215,8 +406,8 @@ async def home(
 ):
     # Define endpoints and their display names
 
-    endpoints = await endpoints_future
-    actions = await actions_future
+    endpoints = get_endpoints()
+    actions = get_action_endpoints()
 
     return f"""
     <!DOCTYPE html>
@@ -230,6 +421,7 @@ async def home(
         <meta name="viewport" content="width=device-width, initial-scale=1.0" />
     </head>
     <body hx-ext="sse" sse-connect="/updates">
+        <div sse-swap="reload" hidden></div>
         <div id="lightbox-overlay" class="lightbox-overlay"></div>
         <h1>{config.project_name}</h1>
         {"\n".join(value['render_func'](value['name'], value['path']) for i, value in enumerate(endpoints))}
@@ -0,0 +1,115 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def format_labels(labels: Labels, **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: Labels) -> Iterator[str]:
+        cumulative = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            cumulative += count
+            yield f"{name}_bucket{format_labels(labels, le=str(bound))} {cumulative}"
+        yield f"{name}_sum{format_labels(labels)} {self.sum}"
+        yield f"{name}_count{format_labels(labels)} {self.count}"
+
+
+class Metrics:
+    """Process-wide counters, gauges and latency histograms, rendered in the Prometheus
+    text format by `/debug/metrics`.
+
+    Pipeline stages are timed with `span(stage, property)`: fetch, parse, update,
+    render and sse (from a change being queued to its SSE frame being sent)."""
+
+    def __init__(self):
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Callable[[], float | Dict[Labels, float]]] = {}
+        self.help: Dict[str, str] = {}
+
+    def describe(self, name: str, help: str):
+        self.help[name] = help
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = tuple(labels.items())
+        histograms = self.histograms.setdefault(name, {})
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage: str, property: str | None = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if property is None:
+                self.observe("frame_stage_seconds", time.perf_counter() - start, stage=stage)
+            else:
+                self.observe("frame_stage_seconds", time.perf_counter() - start, stage=stage, property=property)
+
+    def count(self, name: str, amount: float = 1, **labels: str):
+        counter = self.counters.setdefault(name, {})
+        key = tuple(labels.items())
+        counter[key] = counter.get(key, 0) + amount
+
+    def gauge(self, name: str, read: Callable[[], float | Dict[Labels, float]]):
+        self.gauges[name] = read
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def header(name: str, kind: str):
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, counter in self.counters.items():
+            header(name, "counter")
+            lines.extend(f"{name}{format_labels(labels)} {value}" for labels, value in counter.items())
+        for name, read in self.gauges.items():
+            header(name, "gauge")
+            value = read()
+            samples = value.items() if isinstance(value, dict) else [((), value)]
+            lines.extend(f"{name}{format_labels(labels)} {sample}" for labels, sample in samples)
+        for name, histograms in self.histograms.items():
+            header(name, "histogram")
+            for labels, histogram in histograms.items():
+                lines.extend(histogram.render(name, labels))
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("frame_stage_seconds", "Time spent in each pipeline stage, per property")
+metrics.describe("frame_subprocesses_total", "Subprocesses started")
+metrics.describe("frame_fetches_total", "Raw outputs fetched, per property")
+metrics.describe("frame_fetches_unchanged_total", "Fetches whose raw output matched the previous one and were not parsed again")
+metrics.describe("frame_trigger_fires_total", "Trigger callbacks run after a state change")
+metrics.describe("frame_subprocesses_running", "Subprocesses currently running")
+metrics.describe("frame_triggers", "State subscriptions")
+metrics.describe("frame_stream_clients", "Open update streams (SSE dashboards and fleet aggregators)")
+metrics.describe("frame_stream_queue_depth", "Updates waiting to be sent on open streams")
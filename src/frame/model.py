@@ -1,18 +1,31 @@
 import asyncio
-from contextlib import ExitStack
+from contextlib import ExitStack, contextmanager
 from copy import deepcopy
-import json
-from queue import Queue
-from re import sub
-from sys import settrace
-from typing import Any, Callable, Dict, List, Tuple
-from frame.actions import ActionBase, make_action
+import html
+import itertools
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+from frame.actions import ActionBase, ActionExecutor, Job, make_action
+from frame.cluster import Cluster
+from frame.config import load_config
+from frame.fleet import Fleet
+from frame.fingerprint import Fingerprint, fingerprint
+from frame.images import ImageRef, image_repo
+from frame.journal import Journal
+from frame.metrics import metrics
+from frame.namespace import Namespace, NamespaceAccessor
+from frame.offload import pools
+from frame.osc import osc_server
 from frame.parsers import register_parsers
 from frame.registry import set_defaults
-from frame.values import ValueDelegate, make_value
+from frame.replay import Recorder
+from frame.snapshot import Snapshot
+from frame.utility import CoalescingQueue, Throttle
+from frame.values import UNCHANGED, ValueDelegate, make_value
+from frame.watchdog import activity, loop_monitor
 
-
-State = Dict[str, float|int|str|bool|None]
+State = Dict[str, float | int | str | bool | None]
 
 Selector = Callable[[State], Any]
 Callback = Callable[[Any], None]
@@ -31,30 +44,44 @@ class Trigger:
             return self
 
         def __exit__(self, *args):
-            if self.callback in self.trigger.subscribers:
-                self.trigger.subscribers.remove(self.callback)
+            self.unsubscribe()
 
         def unsubscribe(self):
-            if self.callback in self.trigger.subscribers:
-                self.trigger.subscribers.remove(self.callback)
+            self.trigger.unsubscribe(self.callback)
 
     selector: Selector
     subscribers: List[Callback]
 
-    def __init__(self, selector: Selector):
+    sequence = itertools.count()
+
+    def __init__(self, selector: Selector, keys: Iterable[str] | None = None):
         self.selector = selector
+        # The state keys the selector reads, if known: names, prefixes like `system.*`, or
+        # "*" for any. Keyed triggers only run when one of their keys' fingerprint changed,
+        # and then fire without comparing selected values.
+        self.keys = frozenset(keys) if keys is not None else None
         self.subscribers: List[Callback] = []
+        self.order = next(Trigger.sequence)
+        # Called once the last subscriber leaves, so the owner can drop the trigger
+        self.on_empty: Callable[["Trigger"], None] | None = None
 
     def subscribe(self, callback: Callback) -> Subscription:
         self.subscribers.append(callback)
         return self.Subscription(self, callback)
 
+    def unsubscribe(self, callback: Callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+            if not self.subscribers and self.on_empty is not None:
+                self.on_empty(self)
+
     def update(self, old_model: State, new_model: State):
         new_value = self.selector(new_model)
-        old_value = self.selector(old_model)
-        if new_value != old_value:
-            for subscriber in self.subscribers:
-                subscriber(new_value)
+        if self.keys is None and new_value == self.selector(old_model):
+            return
+        metrics.count("frame_trigger_fires_total", len(self.subscribers))
+        for subscriber in self.subscribers:
+            subscriber(new_value)
 
 
 class Config:
@@ -65,45 +92,156 @@ class Config:
     delegates: Dict[str, ValueDelegate]
     actions: Dict[str, ActionBase]
     actions_order: List[str]
-    triggers: List[Trigger] = []
-    update_tasks: Dict[str, asyncio.Task[Any]] = {}
+    triggers: List[Trigger]
+    update_tasks: Dict[str, asyncio.Task[Any]]
+    rendered: Dict[str, str]
+    stale: Set[str]
+    pending: Set[str]
+    failed: Dict[str, str]
     password_hash: str
 
+    class CopyOnRead(dict):
+        """The state being edited by a `Mutable`. Values are copied when first read, so
+        they can be changed in place without touching the current state, while values
+        that are never read stay shared with it (and are skipped by `changed_keys`)."""
+
+        def __init__(self, state: State):
+            super().__init__(state)
+            self.copied: Set[str] = set()
+
+        def __getitem__(self, key: str) -> Any:
+            value = super().__getitem__(key)
+            if key not in self.copied and isinstance(value, (dict, list)):
+                value = deepcopy(value)
+                self[key] = value
+            return value
+
+        def get(self, key: str, default: Any = None) -> Any:
+            return self[key] if key in self else default
+
+        def __setitem__(self, key: str, value: Any):
+            super().__setitem__(key, value)
+            self.copied.add(key)
+
     class Mutable:
         config: "Config"
-        model: Dict[str, ValueDelegate]
+        model: "Config.CopyOnRead"
 
         def __init__(self, config: "Config"):
             self.config = config
-            self.model = deepcopy(config.state)
+            self.model = Config.CopyOnRead(config.state)
 
         def __enter__(self):
             return self.model
 
         def __exit__(self, exc_type, exc_value, traceback):  # type: ignore
-            self.config.update(self.model)
-
-    def __init__(self, config: Dict[str, Any]):
+            self.config.update(dict(self.model))
+
+    def __init__(self, config: Dict[str, Any], config_path: str | None = None):
+        self.config_path = config_path
+        # What each part of the config looked like, to tell what a reload changed
+        self.sources = self.describe_sources(config)
+        self.model_sources: Dict[str, str] = {}
+        self.action_sources: Dict[str, str] = {}
+        self.property_subscriptions: Dict[str, List[Trigger.Subscription]] = {}
+        self.triggers = []
+        self.unkeyed_triggers: List[Trigger] = []
+        self.key_triggers: Dict[str, List[Trigger]] = {}
+        self.prefix_triggers: Namespace[Trigger] = Namespace()
+        self.names: Namespace[None] = Namespace()
+        self.update_tasks = {}
+        self.polls: Dict[str, float] = {}
+        self.rendered = {}
+        self.fingerprints: Dict[str, Fingerprint] = {}
+        self.stale = set()
+        self.pending = set()
+        self.failed = {}
+        self.refresh_listeners: Dict[str, List[Callback]] = {}
+        self.streams: Dict[CoalescingQueue, str] = {}
         self.path = config.get("path")
         self.settings = self.parse_settings(config.get("settings", {}))
+        self.startup_concurrency = int(self.settings.get("startup", {}).get("concurrency", 8))
+        self.startup_timeout = float(self.settings.get("startup", {}).get("timeout", 10))
+        self.reload_enabled = self.settings.get("reload", {}).get("enabled", True)
+        self.reload_interval = float(self.settings.get("reload", {}).get("interval", 1))
+        self.recorder = Recorder(self.settings.get("record", {}))
+        self.cluster = Cluster(self, self.settings.get("cluster", {}))
+        self.fleet = Fleet(self, self.settings.get("fleet", {}))
+        self.snapshot = Snapshot(self, config.get("name", ""), self.settings.get("snapshot", {}))
         self.parse_types(config.get("types", {}))
         self.parse_defaults(config.get("defaults", {}))
-        (self.delegates, self.state_order) = self.parse_model(config.get("model", {}))
-        self.state = {name: None for name, delegate in self.delegates.items()}
-        (self.actions, self.actions_order) = self.parse_actions(config.get("actions", {}))
+        self.delegates, self.state_order, self.state = {}, [], {}
+        for name, delegate in self.parse_model(config.get("model", {}))[0].items():
+            self.add_property(name, delegate)
+        self.actions, self.actions_order = self.parse_actions(config.get("actions", {}))
+        self.executor = ActionExecutor(lambda action_name: self.actions[action_name])
+        self.journal = Journal(self, self.settings.get("journal", {}))
         self.project_name = config.get("name", "Untitled Project")
+        self.register_metrics()
         self.password_hash = config["password_hash"]
 
         # ...update all values...
-        self.ready = self.pull(*self.state_order)
+        self.ready = self.start()
+
+    async def start(self):
+        loop_monitor.start()
+        if self.config_path and self.reload_enabled:
+            asyncio.ensure_future(self.watch())
+        await self.cluster.start()
+        if not self.cluster.enabled:
+            await self.lead()
+
+    async def lead(self):
+        """Start fetching values: connect to the fleet, start polling and refresh. Run
+        once this process is the runner, at startup or on taking over from another."""
+        await self.fleet.start()
+        self.start_polling()
+        await self.refresh()
+
+    async def refresh(self):
+        """Fetch every value once this process is the runner.
+
+        Properties restored from the snapshot keep serving their last-known value and are
+        fetched last. The rest go highest `priority` first, at most `startup.concurrency`
+        at a time and each bounded by its `timeout`, so one hanging command can't hold
+        up the others."""
+        restored = set(self.snapshot.restore())
+        self.snapshot.start()
+        self.journal.start()
+
+        semaphore = asyncio.Semaphore(self.startup_concurrency)
+
+        async def initial_pull(key: str):
+            async with semaphore:
+                try:
+                    await asyncio.wait_for(self.pull_task(key), self.delegates[key].timeout or self.startup_timeout)
+                except Exception as e:
+                    print(f"Initial fetch of {key} failed: {e!r}")
+                    # With no value to fall back on, show it as unavailable rather than empty
+                    if self.state.get(key) is None:
+                        self.failed[key] = repr(e)
+                    self.settle(key)
+
+        order = sorted(self.state_order, key=lambda key: (key in restored, -self.delegates[key].priority))
+        await asyncio.gather(*[initial_pull(key) for key in order])
 
     def done(self):
         return asyncio.ensure_future(self.ready)
 
+    def register_metrics(self):
+        metrics.gauge("frame_triggers", lambda: len(self.triggers))
+        metrics.gauge("frame_stream_clients", lambda: {(("kind", kind),): sum(1 for k in self.streams.values() if k == kind) for kind in ("sse", "agent")})
+        metrics.gauge("frame_stream_queue_depth", lambda: {(("kind", kind),): sum(len(q) for q, k in self.streams.items() if k == kind) for kind in ("sse", "agent")})
+
     ##########################################################################
     # PARSING
     ##########################################################################
     def parse_settings(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        osc_server.configure(settings.get("osc_server", {}))
+        image_repo.configure(settings.get("images", {}))
+        image_repo.in_use = self.images_in_use
+        loop_monitor.configure(settings.get("loop_monitor", {}))
+        pools.configure(settings.get("offload", {}))
         return settings
 
     def parse_defaults(self, defaults: Dict[str, Any]):
@@ -118,7 +256,8 @@ class Config:
         delegates: Dict[str, ValueDelegate] = {}
 
         for name, value_desc in model_config.items():
-            value = make_value(name, value_desc)
+            self.model_sources[name] = repr(value_desc)
+            value = make_value(name, value_desc, self)
             model_order.append(name)
             delegates[name] = value
 
@@ -129,54 +268,303 @@ class Config:
         actions_order: List[str] = []
 
         for name, action_desc in action_config.items():
+            self.action_sources[name] = repr(action_desc)
             actions_order.append(name)
             actions[name] = make_action(self, name, action_desc)
 
         return actions, actions_order
 
+    def add_property(self, name: str, delegate: ValueDelegate):
+        self.delegates[name] = delegate
+        if name not in self.state_order:
+            self.state_order.append(name)
+            self.names.add(name)
+            self.state[name] = None
+            self.pending.add(name)
+            subscriptions = self.property_subscriptions.setdefault(name, [])
+            subscriptions.append(self.subscribe(lambda m, name=name: m.get(name), lambda _, name=name: self.rendered.pop(name, None), keys=[name]))
+        if delegate.update_time:
+            self.polls[name] = delegate.update_time
+        if delegate.history is not None:
+            subscriptions = self.property_subscriptions.setdefault(name, [])
+            subscriptions.append(self.subscribe(lambda m, name=name: m.get(name), delegate.history.add, keys=[name]))
+
+    def remove_property(self, name: str):
+        task = self.update_tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+        self.polls.pop(name, None)
+        for subscription in self.property_subscriptions.pop(name, []):
+            subscription.unsubscribe()
+
+        self.delegates.pop(name).close()
+        self.state_order.remove(name)
+        self.names.remove(name)
+        self.pending.discard(name)
+        self.stale.discard(name)
+        self.failed.pop(name, None)
+        self.rendered.pop(name, None)
+        with self.mutable() as m:
+            m.pop(name, None)
+
+    def add_action(self, name: str, action: ActionBase):
+        self.actions[name] = action
+        if name not in self.actions_order:
+            self.actions_order.append(name)
+
+    def remove_action(self, name: str):
+        # Jobs already running keep their action object (and concurrency slots)
+        self.actions.pop(name).close()
+        self.actions_order.remove(name)
+        self.executor.slots.pop(name, None)
+
+    ##########################################################################
+    # RELOADING
+    ##########################################################################
+    def describe_sources(self, config: Dict[str, Any]) -> Dict[str, str]:
+        return {key: repr(config.get(key)) for key in ("settings", "types", "defaults")}
+
+    async def watch(self):
+        """Reload the config file whenever it is saved."""
+        mtime = os.stat(self.config_path).st_mtime_ns
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                current = os.stat(self.config_path).st_mtime_ns
+            except OSError:
+                continue
+            if current == mtime:
+                continue
+            mtime = current
+            try:
+                self.reload(await asyncio.to_thread(load_config, self.config_path))
+            except Exception as e:
+                print(f"Could not reload {self.config_path}: {e!r}")
+
+    def reload(self, config: Dict[str, Any]):
+        """Apply an edited config in place.
+
+        Only properties and actions whose definitions changed are rebuilt (all of them if
+        `types` or `defaults` changed); the rest keep their state, pollers and subscribers.
+        Open dashboards re-render changed properties, and reload the page if properties or
+        actions were added or removed. Changes to `settings` need a restart."""
+        sources = self.describe_sources(config)
+        if sources["settings"] != self.sources["settings"]:
+            print(f"Settings in {self.config_path} changed; restart to apply them")
+        rebuild = sources["types"] != self.sources["types"] or sources["defaults"] != self.sources["defaults"]
+        if rebuild:
+            self.parse_types(config.get("types", {}))
+            self.parse_defaults(config.get("defaults", {}))
+
+        model_config = config.get("model", {})
+        model_sources = {name: repr(desc) for name, desc in model_config.items()}
+        changed = [name for name, source in model_sources.items() if name in self.model_sources and (rebuild or source != self.model_sources[name])]
+        removed = [name for name in self.model_sources if name not in model_sources]
+        added = [name for name in model_sources if name not in self.model_sources]
+
+        action_config = config.get("actions", {})
+        action_sources = {name: repr(desc) for name, desc in action_config.items()}
+        changed_actions = [name for name, source in action_sources.items() if name in self.action_sources and (rebuild or source != self.action_sources[name])]
+        removed_actions = [name for name in self.action_sources if name not in action_sources]
+        added_actions = [name for name in action_sources if name not in self.action_sources]
+
+        # Build everything before touching the running model, so a broken edit leaves it as it was
+        delegates: Dict[str, ValueDelegate] = {}
+        actions: Dict[str, ActionBase] = {}
+        try:
+            for name in changed + added:
+                delegates[name] = make_value(name, model_config[name], self)
+            for name in changed_actions + added_actions:
+                actions[name] = make_action(self, name, action_config[name])
+        except Exception:
+            for delegate in delegates.values():
+                delegate.close()
+            for action in actions.values():
+                action.close()
+            raise
+
+        layout_changed = self.project_name != config.get("name", "Untitled Project")
+        layout = self.describe_layout()
+        self.sources = sources
+        self.project_name = config.get("name", "Untitled Project")
+        self.password_hash = config["password_hash"]
+
+        for name in removed + changed:
+            self.remove_property(name)
+        for name, delegate in delegates.items():
+            self.add_property(name, delegate)
+        # Keep the file's order, followed by properties added at runtime (fleet agents)
+        self.state_order[:] = [*model_sources, *(name for name in self.state_order if name not in model_sources)]
+        self.model_sources = model_sources
+
+        for name in removed_actions + changed_actions:
+            self.remove_action(name)
+        for name, action in actions.items():
+            self.add_action(name, action)
+        self.actions_order[:] = [*action_sources, *(name for name in self.actions_order if name not in action_sources)]
+        self.action_sources = action_sources
+
+        if self.cluster.runner:
+            for name in delegates:
+                if self.delegates[name].update_time:
+                    self.auto_update(name, self.delegates[name].update_time)
+            asyncio.ensure_future(self.pull(*delegates))
+
+        print(
+            f"Reloaded {self.config_path}: properties {len(added)} added, {len(changed)} changed, {len(removed)} removed; "
+            f"actions {len(added_actions)} added, {len(changed_actions)} changed, {len(removed_actions)} removed"
+        )
+        # Changed values re-render on their own; anything else on the page needs a new page
+        if layout_changed or changed_actions or self.describe_layout() != layout:
+            for queue in self.streams:
+                queue.put(None, time.perf_counter())
+
+    def describe_layout(self) -> List[Any]:
+        """What the page shows besides values: which properties and actions, in what order."""
+        return [
+            *((name, self.delegates[name].display_name, repr(self.delegates[name].desc.get("renderer"))) for name in self.state_order),
+            *self.actions_order,
+        ]
+
     ##########################################################################
     # STATE
     ##########################################################################
     def update(self, new_model: State):
         old_model = self.state
         self.state = new_model
-        for trigger in self.triggers:
-            trigger.update(old_model, new_model)
+        changed = self.changed_keys(old_model, new_model)
+        if not changed:
+            return
+        if self.stale or self.pending or self.failed:
+            self.stale.difference_update(changed)
+            self.pending.difference_update(changed)
+            for key in changed:
+                self.failed.pop(key, None)
+        with metrics.span("update"):
+            for trigger in self.dispatch(changed):
+                trigger.update(old_model, new_model)
+        self.cluster.publish(new_model, changed)
+        self.journal.record_state(new_model, changed)
+
+    def changed_keys(self, old_model: State, new_model: State) -> Set[str]:
+        """The keys whose values differ.
+
+        Each new value is fingerprinted once, when stored; values shared with the old
+        state are the same objects and are skipped entirely; the rest are compared by
+        digest rather than by value."""
+        changed: Set[str] = set()
+        for key, value in new_model.items():
+            if key in old_model and old_model[key] is value and key in self.fingerprints:
+                continue
+            old = self.fingerprints.get(key)
+            if old is None and key in old_model:
+                old = fingerprint(old_model[key])
+            new = self.fingerprints[key] = fingerprint(value)
+            if key not in old_model or new != old:
+                changed.add(key)
+        for key in old_model.keys() - new_model.keys():
+            self.fingerprints.pop(key, None)
+            changed.add(key)
+        return changed
 
     def mutable(self):
         return self.Mutable(self)
 
     async def pull_task(self, key: str):
+        activity.set(f"property:{key}")
         value = await self.delegates[key].get()
-        with self.mutable() as m:
-            m[key] = value
+        if value is not UNCHANGED:
+            with self.mutable() as m:
+                m[key] = value
+        if self.failed.pop(key, None) is not None:
+            # Still no value, but no longer an error: settle re-renders it
+            self.stale.add(key)
+        self.settle(key)
+
+    def settle(self, key: str):
+        """Clear the loading / stale marker of `key` once it has been fetched.
+
+        A fetched value equal to the restored one (or a failed fetch) changes nothing
+        in the state, so renderers are told directly. A failed first fetch leaves the
+        key in `failed`, which renders as unavailable until a value arrives."""
+        if key in self.stale or key in self.pending:
+            self.stale.discard(key)
+            self.pending.discard(key)
+            for callback in list(self.refresh_listeners.get(key, [])):
+                callback(self.state.get(key))
 
     async def pull(self, *keys: str):
+        # Followers receive values from the runner instead of fetching them
+        if not self.cluster.runner:
+            return
         await asyncio.gather(*[self.pull_task(key) for key in keys])
 
     ##########################################################################
     # ACCESS
     ##########################################################################
-    def subscribe(self, selector: Selector | str, callback: Callback) -> Trigger.Subscription:
+    def subscribe(self, selector: Selector | str, callback: Callback, keys: Iterable[str] | None = None) -> Trigger.Subscription:
         if isinstance(selector, str):
             asyncio.create_task(self.pull(selector))
-            return self.subscribe(lambda m: m[selector], callback)
+            return self.subscribe(lambda m: m[selector], callback, keys=[selector])
 
-        trigger = Trigger(selector)
+        trigger = Trigger(selector, keys)
+        trigger.on_empty = self.remove_trigger
         self.triggers.append(trigger)
+        if trigger.keys is None:
+            self.unkeyed_triggers.append(trigger)
+        else:
+            for key in trigger.keys:
+                if key == "*" or key.endswith(".*"):
+                    self.prefix_triggers.add(key[:-2], trigger)
+                else:
+                    self.key_triggers.setdefault(key, []).append(trigger)
         return trigger.subscribe(callback)
 
+    def remove_trigger(self, trigger: Trigger):
+        self.triggers.remove(trigger)
+        if trigger.keys is None:
+            self.unkeyed_triggers.remove(trigger)
+            return
+        for key in trigger.keys:
+            if key == "*" or key.endswith(".*"):
+                self.prefix_triggers.remove(key[:-2], trigger)
+            else:
+                key_triggers = self.key_triggers[key]
+                key_triggers.remove(trigger)
+                if not key_triggers:
+                    del self.key_triggers[key]
+
+    def dispatch(self, changed: Set[str]) -> List[Trigger]:
+        """The triggers to run for a change to `changed`, in subscription order: those on
+        the changed keys, on any prefix of them, and those without keys."""
+        triggers: Dict[Trigger, None] = dict.fromkeys(self.unkeyed_triggers)
+        for key in changed:
+            triggers.update(dict.fromkeys(self.key_triggers.get(key, ())))
+            for node in self.prefix_triggers.ancestors(key):
+                triggers.update(dict.fromkeys(node.items))
+        return sorted(triggers, key=lambda trigger: trigger.order)
+
+    def accessor(self, state: State | None = None) -> NamespaceAccessor:
+        """The state with dotted names readable as attributes, for templates."""
+        return NamespaceAccessor(self.state if state is None else state, self.names.root)
+
     async def do_auto_update(self, property_name: str, seconds: float):
-        await self.pull(property_name)
+        # The first fetch is left to refresh(), which orders and bounds them
         while True:
             await asyncio.sleep(seconds)
             await self.pull(property_name)
 
     def auto_update(self, property_name: str, seconds: float):
+        self.polls[property_name] = seconds
         if self.update_tasks.get(property_name):
             self.update_tasks[property_name].cancel()
 
-        self.update_tasks[property_name] = asyncio.ensure_future(self.do_auto_update(property_name, seconds))
+        if self.cluster.runner:
+            self.update_tasks[property_name] = asyncio.ensure_future(self.do_auto_update(property_name, seconds))
+
+    def start_polling(self):
+        for property_name, seconds in self.polls.items():
+            self.auto_update(property_name, seconds)
 
     def get_properties(self) -> List[str]:
         return self.state_order
@@ -184,6 +572,9 @@ class Config:
     def get_actions(self) -> List[str]:
         return self.actions_order
 
+    def images_in_use(self) -> List[ImageRef]:
+        return [value for value in self.state.values() if isinstance(value, ImageRef)]
+
     def get_property(self, name: str) -> ValueDelegate:
         return self.delegates[name]
 
@@ -194,10 +585,24 @@ class Config:
     def get(self, property_name: str) -> Any:
         return self.state[property_name]
 
-    def get_rendered(self, property_name: str) -> str:
-        result = self.get(property_name)
-        renderer = self.delegates[property_name].renderer
-        return renderer.render_data(result)
+    async def get_rendered(self, property_name: str) -> str:
+        if property_name in self.pending:
+            return "<div class='value loading'>Loading…</div>"
+        if property_name in self.failed:
+            return f"<div class='value unavailable' title='{html.escape(self.failed[property_name])}'>Unavailable</div>"
+
+        rendered = self.rendered.get(property_name)
+        if rendered is None:
+            delegate = self.delegates[property_name]
+            value = self.get(property_name)
+            with metrics.span("render", property_name):
+                rendered = await delegate.renderer.offload.run(delegate.renderer.render_data, value, delegate.size, delegate.renderer.task)
+            # Only cache if the value didn't change while rendering elsewhere
+            if self.get(property_name) is value:
+                self.rendered[property_name] = rendered
+        if property_name in self.stale:
+            return f"<div class='stale' title='Last known value, refreshing'>{rendered}</div>"
+        return rendered
 
     def get_rendered_action(self, action_name: str) -> str:
         action = self.actions[action_name]
@@ -206,47 +611,94 @@ class Config:
         else:
             return None
 
-    def subscribe_rendered_updates(self, property_name: str, queue: asyncio.Queue[Any]) -> Trigger.Subscription:
-        renderer = self.delegates[property_name].renderer
-
-        def callback(value: Any):
-            """Push a new value into the queue."""
-            asyncio.create_task(queue.put((property_name, renderer.render_data(value))))
-
-        return self.subscribe(property_name, callback)
+    @contextmanager
+    def subscribe_rendered_updates(self, property_name: str, queue: CoalescingQueue):
+        """Put `property_name` into `queue` when it changes, at most `max_fps` times per second.
+
+        The queued value is the time it was queued, for the sse stage metric."""
+        throttle = Throttle(self.delegates[property_name].max_fps, lambda _: queue.put(property_name, time.perf_counter()))
+        refresh_listeners = self.refresh_listeners.setdefault(property_name, [])
+        refresh_listeners.append(throttle)
+        try:
+            with self.subscribe(lambda m: m.get(property_name), throttle, keys=[property_name]) as subscription:
+                yield subscription
+        finally:
+            refresh_listeners.remove(throttle)
+            throttle.cancel()
+
+    async def get_rendered_event(self, property_name: str) -> str:
+        id = self.get_property_path(property_name).replace("/", "-")[1:]
+        data = "".join(f"data: {line}\n" for line in (await self.get_rendered(property_name)).split("\n"))
+        return f"event:{id}\n{data}\n"
 
     async def get_rendered_update_stream(self):
         # yield "data: started\n\n"
         yield "event:message\ndata: updated\n\n"
+        activity.set("sse")
 
-        await self.pull(*self.get_properties())
-        for property_name in self.get_properties():
-            renderer = self.delegates[property_name].renderer
-            rendered = renderer.render_data(self.state[property_name])
-            id = self.get_property_path(property_name).replace("/", "-")[1:]
-
-            yield f"event:{id}\n"
-            for line in rendered.split("\n"):
-                yield f"data: {line}\n"
-            yield "\n"
+        queue = CoalescingQueue()
+        with ExitStack() as stack, self.stream(queue, "sse"):
+            for property_name in self.get_properties():
+                stack.enter_context(self.subscribe_rendered_updates(property_name, queue))
 
-        queue = asyncio.Queue[Any]()
-        with ExitStack() as stack:
-            subscriptions = [stack.enter_context(self.subscribe_rendered_updates(name, queue)) for name in self.get_properties()]
+            # Send what we have straight away; values still loading arrive as updates
+            for property_name in self.get_properties():
+                yield await self.get_rendered_event(property_name)
+            asyncio.ensure_future(self.pull(*[name for name in self.get_properties() if name not in self.pending and name not in self.stale]))
 
             while True:
-                property_name, rendered = await queue.get()
-                renderer = self.delegates[property_name].renderer
-                rendered = renderer.render_data(self.state[property_name])
-                id = self.get_property_path(property_name).replace("/", "-")[1:]
-
-                yield f"event:{id}\n"
-                for line in rendered.split("\n"):
-                    yield f"data: {line}\n"
-                yield "\n"
-
-    async def do(self, action_name: str, params: Dict[str, Any]) -> Any:
-        return await self.actions[action_name].call(params, lambda action_name: self.actions[action_name])
+                property_name, queued = await queue.get()
+                if property_name is None:
+                    # The config was reloaded and the page changed; the browser reconnects
+                    yield "event:reload\ndata: <script>location.reload()</script>\n\n"
+                    return
+                if property_name not in self.delegates:
+                    continue
+                yield await self.get_rendered_event(property_name)
+                metrics.observe("frame_stage_seconds", time.perf_counter() - queued, stage="sse", property=property_name)
+
+    @contextmanager
+    def stream(self, queue: CoalescingQueue, kind: str):
+        """Track an open update stream for the client and queue depth metrics."""
+        self.streams[queue] = kind
+        try:
+            yield queue
+        finally:
+            del self.streams[queue]
+
+    async def submit(self, action_name: str, params: Dict[str, Any]) -> Job:
+        if not self.cluster.runner:
+            return await self.cluster.call("submit", action_name, params)
+        return self.executor.submit(action_name, params)
+
+    async def do(self, action_name: str, params: Dict[str, Any]) -> Job:
+        if not self.cluster.runner:
+            return await self.cluster.call("do", action_name, params)
+        return await self.executor.wait(self.executor.submit(action_name, params))
+
+    async def get_job(self, job_id: str, wait: float = 0) -> Job | None:
+        if not self.cluster.runner:
+            return await self.cluster.call("get_job", job_id, wait)
+
+        job = self.executor.get(job_id)
+        if job is not None and wait > 0:
+            await self.executor.wait(job, timeout=wait)
+        return job
+
+    async def cancel_job(self, job_id: str) -> Job | None:
+        if not self.cluster.runner:
+            return await self.cluster.call("cancel_job", job_id)
+
+        job = self.executor.get(job_id)
+        if job is not None:
+            job.cancel()
+            await self.executor.wait(job, timeout=5)
+        return job
+
+    async def get_jobs(self) -> List[Job]:
+        if not self.cluster.runner:
+            return await self.cluster.call("get_jobs")
+        return list(self.executor.jobs.values())
 
     async def render_output(self, property_name: str, path: str) -> str:
         renderer = self.state[property_name].renderer
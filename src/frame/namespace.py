@@ -0,0 +1,105 @@
+from typing import Any, Dict, Generic, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+def split(name: str) -> List[str]:
+    return name.split(".") if name else []
+
+
+class Node(Generic[T]):
+    __slots__ = ("children", "name", "items")
+
+    def __init__(self):
+        self.children: Dict[str, Node[T]] = {}
+        # The full dotted name, if it was added itself (rather than an item under it)
+        self.name: str | None = None
+        self.items: List[T] = []
+
+    def names(self) -> Iterator[str]:
+        if self.name is not None:
+            yield self.name
+        for child in self.children.values():
+            yield from child.names()
+
+
+class Namespace(Generic[T]):
+    """A prefix trie over dotted names (`system.cpu`, `host1.system.cpu`), with an
+    optional list of items at each node.
+
+    Lookups and prefix walks take time proportional to the number of segments in the
+    name, not to the number of names."""
+
+    def __init__(self):
+        self.root: Node[T] = Node()
+
+    def add(self, name: str, item: T | None = None) -> Node[T]:
+        node = self.root
+        for segment in split(name):
+            node = node.children.setdefault(segment, Node())
+        if item is None:
+            node.name = name
+        else:
+            node.items.append(item)
+        return node
+
+    def remove(self, name: str, item: T | None = None):
+        path = [self.root]
+        for segment in split(name):
+            node = path[-1].children.get(segment)
+            if node is None:
+                return
+            path.append(node)
+        if item is None:
+            path[-1].name = None
+        elif item in path[-1].items:
+            path[-1].items.remove(item)
+
+        # Prune the nodes that no longer lead anywhere
+        for parent, segment, node in reversed(list(zip(path, split(name), path[1:]))):
+            if node.children or node.items or node.name is not None:
+                break
+            del parent.children[segment]
+
+    def find(self, name: str) -> Node[T] | None:
+        node = self.root
+        for segment in split(name):
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+
+    def ancestors(self, name: str) -> Iterator[Node[T]]:
+        """The nodes of every proper prefix of `name`, starting with the root."""
+        node = self.root
+        for segment in split(name):
+            yield node
+            node = node.children.get(segment)
+            if node is None:
+                return
+
+
+class NamespaceAccessor:
+    """Attribute access to dotted keys of `values` for jinja templates, so a condition
+    can read `system.cpu` for the key `system.cpu`. Each lookup is one trie step."""
+
+    def __init__(self, values: Dict[str, Any], node: Node[Any]):
+        self.values = values
+        self.node = node
+
+    def keys(self):
+        return self.node.children.keys()
+
+    def __getattr__(self, name: str) -> Any:
+        child = self.node.children.get(name)
+        if child is None:
+            raise AttributeError(f"'{type(self).__name__}' has no attribute '{name}'")
+        if child.name is not None and child.name in self.values:
+            return self.values[child.name]
+        return NamespaceAccessor(self.values, child)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self.__getattr__(key)
+        except AttributeError:
+            raise KeyError(key)
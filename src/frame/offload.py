@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+from typing import Any, Callable, Dict, Tuple
+
+OFFLOAD_MODES = (None, "thread", "process", "auto")
+
+# Builds the call sent to a worker process for a value: a module-level function and its arguments
+Task = Callable[[Any], Tuple[Callable[..., Any], Tuple[Any, ...]]]
+
+
+def call(owner: Callable[[Any], Any], value: Any) -> Any:
+    return owner(value)
+
+
+class Pools:
+    """The shared worker pools used by `Offload`, created on first use.
+
+    Configured under `settings.offload`, e.g. `{threads: 4, processes: 2}`. Threads still
+    share the GIL but let the event loop interleave with the work; processes run it in
+    parallel at the cost of pickling the input and output."""
+
+    def __init__(self):
+        self.configure({})
+        self.threads: ThreadPoolExecutor | None = None
+        self.processes: ProcessPoolExecutor | None = None
+
+    def configure(self, settings: Dict[str, Any]):
+        self.thread_workers = int(settings.get("threads", 2))
+        self.process_workers = int(settings.get("processes", 2))
+
+    def get(self, mode: str) -> Executor:
+        if mode == "thread":
+            if self.threads is None:
+                self.threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="frame-offload")
+            return self.threads
+
+        if self.processes is None:
+            # Forking a process that runs the writer and watchdog threads is unsafe
+            self.processes = ProcessPoolExecutor(max_workers=self.process_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.processes
+
+
+pools = Pools()
+
+
+class Offload:
+    """Where a parser or renderer runs, from its `offload` setting.
+
+    Inputs smaller than `offload_threshold` bytes always run inline, where dispatching
+    would cost more than it saves. With `offload: auto`, larger inputs go to a thread,
+    and those of at least `process_threshold` bytes to a process."""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.mode = settings.get("offload")
+        if self.mode not in OFFLOAD_MODES:
+            raise ValueError(f"Unknown offload mode: {self.mode}")
+        self.threshold = int(settings.get("offload_threshold", 64 * 1024))
+        self.process_threshold = int(settings.get("process_threshold", 1024 * 1024))
+
+    def select(self, size: int) -> str | None:
+        if self.mode is None or size < self.threshold:
+            return None
+        if self.mode == "auto":
+            return "process" if size >= self.process_threshold else "thread"
+        return self.mode
+
+    async def run(self, function: Callable[[Any], Any], value: Any, size: int, task: Task | None = None) -> Any:
+        """Call `function(value)` inline or in a pool.
+
+        `function` is usually a bound method, and pickling one for a process pickles its
+        whole object too, so process mode sends `task(value)` instead. Without a `task`,
+        process mode uses a thread."""
+        mode = self.select(size)
+        if mode is None:
+            return function(value)
+        if mode == "process" and task is not None:
+            process_function, args = task(value)
+            return await asyncio.get_running_loop().run_in_executor(pools.get(mode), process_function, *args)
+        return await asyncio.get_running_loop().run_in_executor(pools.get("thread"), function, value)
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Callable, Dict, Tuple
+
+from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_server import AsyncIOOSCUDPServer
+
+Handler = Callable[[str, Tuple[Any, ...]], None]
+
+
+class OSCServer:
+    """A single UDP OSC server shared by every `osc` value."""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.dispatcher = Dispatcher()
+        self.transport: asyncio.DatagramTransport | None = None
+        self.starting: asyncio.Future[None] | None = None
+        self.configure(settings)
+
+    def configure(self, settings: Dict[str, Any]):
+        self.address = settings.get("address", "0.0.0.0")
+        self.port = int(settings.get("port", 57130))
+
+    def map(self, address: str, handler: Handler) -> Any:
+        return self.dispatcher.map(address, lambda osc_address, *args: handler(osc_address, args))
+
+    def unmap(self, address: str, mapping: Any):
+        """Remove a handler, given what `map` returned for it."""
+        self.dispatcher.unmap(address, mapping)
+
+    async def start(self):
+        if self.starting is None:
+            self.starting = asyncio.ensure_future(self._start())
+        await self.starting
+
+    async def _start(self):
+        server = AsyncIOOSCUDPServer((self.address, self.port), self.dispatcher, asyncio.get_running_loop())
+        self.transport, _ = await server.create_serve_endpoint()
+        print(f"OSC server listening on {self.address}:{self.port}")
+
+    def stop(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        self.starting = None
+
+
+osc_server = OSCServer({})
@@ -1,7 +1,8 @@
 import json
 import re
-from typing import Any, Dict, Tuple
+from typing import Any, AsyncIterator, Dict, Tuple
 
+from frame.offload import Offload, call
 from frame.registry import TypeRegistry
 
 
@@ -13,10 +14,15 @@ class ParserBase:
 
     def __init__(self, settings: Dict[str, Any]):
         self.settings = settings
+        self.offload = Offload(settings)
 
     def __call__(self, value: str) -> Any:
         raise NotImplementedError("Subclasses must implement this method")
 
+    def task(self, value: str) -> Tuple[Any, Tuple[Any, ...]]:
+        """The call to send to a worker process. Parsers only hold their settings, so they travel whole."""
+        return call, (self, value)
+
 
 registry = TypeRegistry[ParserBase]("parser")
 
@@ -30,11 +36,18 @@ class JsonParser(ParserBase, name="json"):
 
 
 class RegexParser(ParserBase, name="regex"):
+    """Extracts `group` (an index, or a `{key: group}` dict) from matches of `pattern`.
+
+    With `list`, every match is returned (the default when `group` is a dict); with
+    `columns` as well, a dict `group` yields `{key: [values...]}` instead of one dict per
+    row. With `stream`, a shell getter feeds stdout in line by line as the command
+    produces it, so the pattern is matched against each line rather than the whole output."""
+
     def __init__(self, settings: Dict[str, Any]):
         super().__init__(settings)
 
         self.pattern = settings.get("pattern", (".*"))
-        self.is_list = settings.get("list", False)
+        self.regex = re.compile(self.pattern)
 
         group_setting = settings.get("group", 0)
         if isinstance(group_setting, int):
@@ -46,25 +59,57 @@ class RegexParser(ParserBase, name="regex"):
         else:
             raise ValueError("Invalid group setting")
 
+        self.is_list = settings.get("list", self.group_struct is not None)
+        self.columns = settings.get("columns", False)
+        if self.columns and (self.group_struct is None or not self.is_list):
+            raise ValueError("Columnar output needs a dict group and list output")
+        self.streaming = settings.get("stream", False)
+
     def parse_item(self, match: re.Match[str]) -> str | Dict[str, str]:
         if self.group_struct is not None:
             return {k: match.group(v) for k, v in self.group_struct.items()}
         else:
             return match.group(self.group)
 
-    def __call__(self, value: str) -> str | Dict[str, str] | list[str | Dict[str, str]]:
-        if self.group_struct is not None:
-            match = re.finditer(self.pattern, value)
-            if not match:
-                raise ValueError(f"Pattern {self.pattern} not found in {value}")
-            else:
-                return [self.parse_item(m) for m in match]
+    def new_result(self) -> list[Any] | Dict[str, list[str]]:
+        if self.columns:
+            return {k: [] for k in self.group_struct}
+        return []
+
+    def add(self, result: list[Any] | Dict[str, list[str]], match: re.Match[str]):
+        if self.columns:
+            for k, v in self.group_struct.items():
+                result[k].append(match.group(v))
         else:
-            match = re.search(self.pattern, value)
-            if not match:
-                raise ValueError(f"Pattern {self.pattern} not found in {value}")
-            else:
-                return match.group(self.group)
+            result.append(self.parse_item(match))
+
+    def __call__(self, value: str) -> Any:
+        if self.is_list:
+            result = self.new_result()
+            for match in self.regex.finditer(value):
+                self.add(result, match)
+            return result
+
+        match = self.regex.search(value)
+        if not match:
+            raise ValueError(f"Pattern {self.pattern} not found in {value}")
+        return self.parse_item(match)
+
+    async def parse_stream(self, lines: AsyncIterator[str]) -> Any:
+        """Parse output as it arrives; single matches return as soon as they are found."""
+        result = self.new_result()
+        async for line in lines:
+            if not self.is_list:
+                match = self.regex.search(line)
+                if match:
+                    return self.parse_item(match)
+                continue
+            for match in self.regex.finditer(line):
+                self.add(result, match)
+
+        if not self.is_list:
+            raise ValueError(f"Pattern {self.pattern} not found in output")
+        return result
 
 
 class StringParser(ParserBase, name="string"):
@@ -82,12 +127,18 @@ class DetectParser(RegexParser, name="detect"):
         self.invert = settings.get("invert", False)
 
     def __call__(self, value: str) -> bool:  # type: ignore
-        match = re.search(self.pattern, value)
+        match = self.regex.search(value)
         if not match:
             return False if not (self.invert) else True
         else:
             return True if not (self.invert) else False
 
+    async def parse_stream(self, lines: AsyncIterator[str]) -> bool:  # type: ignore
+        async for line in lines:
+            if self.regex.search(line):
+                return not self.invert
+        return self.invert
+
 
 class SequenceParser(ParserBase, name="sequence"):
     def __init__(self, settings: Dict[str, Any]):
@@ -0,0 +1,35 @@
+from collections import Counter
+import os
+import sys
+import threading
+import time
+from typing import Collection
+
+
+def sample_stacks(seconds: float, interval: float, thread_ids: Collection[int] | None = None) -> Counter[str]:
+    """Sample the stacks of running threads every `interval` seconds for `seconds`.
+
+    Meant to run on its own thread; it never samples itself. Stacks are keyed in the
+    collapsed format (`thread;outer;...;inner`) used by flamegraph tools."""
+    counts: Counter[str] = Counter()
+    own = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    end = time.monotonic() + seconds
+
+    while time.monotonic() < end:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (thread_ids is not None and thread_id not in thread_ids):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            counts[";".join([names.get(thread_id, str(thread_id)), *reversed(stack)])] += 1
+        time.sleep(interval)
+
+    return counts
+
+
+def collapse(counts: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
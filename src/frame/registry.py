@@ -1,23 +1,26 @@
 from copy import deepcopy
+from functools import cache
 from typing import Any, Dict, Generic, Tuple, Type
 from annotated_types import T
 import inspect
 
 
-def can_accept_kwargs(func, kwargs_dict):
-    """Check if function can accept the provided kwargs."""
-    sig = inspect.signature(func)
+@cache
+def accepted_kwargs(func) -> Tuple[bool, frozenset[str]]:
+    """Whether `func` takes **kwargs, and its parameter names; inspected once per function."""
+    parameters = inspect.signature(func).parameters
+    return any(param.kind == param.VAR_KEYWORD for param in parameters.values()), frozenset(parameters)
 
-    # Check for **kwargs parameter
-    for param in sig.parameters.values():
-        if param.kind == param.VAR_KEYWORD:
-            return True
 
-    # Check for specific named parameters
-    return any(name in sig.parameters for name in kwargs_dict)
+def can_accept_kwargs(func, kwargs_dict):
+    """Check if function can accept the provided kwargs."""
+    var_keyword, names = accepted_kwargs(func)
+    return var_keyword or any(name in names for name in kwargs_dict)
 
 
 defaults: Dict[str, Dict[str, Any]] = {}
+# Bumped by set_defaults, so registries know their resolved types are out of date
+defaults_version = 0
 
 
 class TypeRegistry(Generic[T]):
@@ -28,6 +31,9 @@ class TypeRegistry(Generic[T]):
         self.types: Dict[str, Type[T]] = {}
         self.refs: Dict[str, Dict[str, Any]] = {}
         self.defaults = defaults
+        # Type name -> (registered type, settings from defaults and refs), see `resolve`
+        self.resolved: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self.resolved_version = defaults_version
 
     def register(self, name: str, cls: Type[T]) -> None:
         """Register a type with a given name."""
@@ -36,22 +42,29 @@ class TypeRegistry(Generic[T]):
     def register_ref(self, name: str, settings: Dict[str, Any]) -> None:
         """Register reference settings for a type."""
         self.refs[name] = settings
+        self.resolved.clear()
 
     def default_settings(self, name: str) -> Dict[str, Any]:
         return {**self.defaults, **deepcopy(defaults.get(self.name, {}).get(name, {}))}
 
-    def make(self, settings: Dict[str, Any] | str, **kwargs) -> Tuple[T, Dict[str, Any]]:
-        """Create an instance of the requested type with proper settings."""
-        if isinstance(settings, str):
-            settings = {"type": settings}
-
-        base_settings: Dict[str, Any] = self.default_settings(settings["type"])
+    def resolve(self, name: str) -> Tuple[str, Dict[str, Any]]:
+        """Follow the ref chain of `name` to a registered type, merging defaults and ref
+        settings along the way. Resolved once per name until refs or defaults change."""
+        if self.resolved_version != defaults_version:
+            self.resolved.clear()
+            self.resolved_version = defaults_version
+        resolved = self.resolved.get(name)
+        if resolved is not None:
+            return resolved
+
+        base_settings: Dict[str, Any] = self.default_settings(name)
         type_chain: set[str] = set()
-        type_chain.add(settings["type"])
+        type_chain.add(name)
 
-        ref_type = self.refs.get(settings["type"])
+        type_name = name
+        ref_type = self.refs.get(name)
         while ref_type is not None:
-            settings["type"] = ref_type["type"]
+            type_name = ref_type["type"]
             base_settings = {
                 **base_settings,
                 **self.default_settings(ref_type["type"]),
@@ -64,7 +77,17 @@ class TypeRegistry(Generic[T]):
             type_chain.add(ref_type["type"])
             ref_type = self.refs.get(ref_type["type"])
 
-        settings = {**base_settings, **settings}
+        resolved = self.resolved[name] = (type_name, base_settings)
+        return resolved
+
+    def make(self, settings: Dict[str, Any] | str, **kwargs) -> Tuple[T, Dict[str, Any]]:
+        """Create an instance of the requested type with proper settings."""
+        if isinstance(settings, str):
+            settings = {"type": settings}
+
+        settings["type"], base_settings = self.resolve(settings["type"])
+        # Instances may change their settings, so each gets its own copy of the shared ones
+        settings = {**deepcopy(base_settings), **settings}
 
         cls: Type[T] | None = self.types.get(settings["type"])
 
@@ -80,5 +103,7 @@ class TypeRegistry(Generic[T]):
 
 def set_defaults(settings: Dict[str, Any]) -> Dict[str, Any]:
     """Set default values for all types."""
+    global defaults_version
     defaults.update(settings)
+    defaults_version += 1
     return defaults
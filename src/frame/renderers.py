@@ -1,11 +1,17 @@
-from typing import Dict, Any, Generic, Tuple, Type
+import time
+from typing import TYPE_CHECKING, Dict, Any, Generic, Tuple, Type
 import uuid
 
 from annotated_types import T
+from frame.history import History
 from frame.images import ImageRef
+from frame.offload import Offload
 from frame.registry import TypeRegistry
 import html as html_module
 
+if TYPE_CHECKING:
+    from frame.actions import ActionBase
+
 
 def render_nested_list(data, indent=0):
     """Recursively renders nested dictionaries and lists as indented HTML."""
@@ -240,10 +246,15 @@ class RendererBase:
     def __init__(self, settings: Dict[str, Any]):
         self.folding = settings.get("folding", False)
         self.streaming = True
+        self.offload = Offload(settings)
 
     def render_data(self, data: Any) -> str:
         raise NotImplementedError("Subclasses must implement this method")
 
+    def task(self, data: Any) -> Tuple[Any, Tuple[Any, ...]]:
+        """The call to send to a worker process. Renderers holding more than their settings override this."""
+        return render_with, (self, data)
+
     def render_list_item(self, name: str, path: str) -> str:
         if self.folding:
             return render_folding_value(name, path)
@@ -254,8 +265,12 @@ class RendererBase:
 renderer_registry = TypeRegistry[RendererBase]("renderer")
 
 
-def make_renderer(settings: Dict[str, Any] | str) -> Tuple[RendererBase, Dict[str, Any]]:
-    return renderer_registry.make(settings)
+def render_with(renderer: RendererBase, data: Any) -> str:
+    return renderer.render_data(data)
+
+
+def make_renderer(settings: Dict[str, Any] | str, **kwargs) -> Tuple[RendererBase, Dict[str, Any]]:
+    return renderer_registry.make(settings, **kwargs)
 
 
 # Fix the load_renderer_types function
@@ -304,18 +319,75 @@ class StatusRenderer(RendererBase, name="status"):
             return f"<div class='value failure'>{self.false_string}</div>"
 
 
+def render_sparkline(data: Any, times: list, values: list, width: int, height: int) -> str:
+    value = f"<div class='value'>{html_module.escape(str(data))}</div>"
+    if len(values) < 2:
+        return value
+
+    t0, t1 = times[0], max(times[-1], times[0] + 1e-9)
+    low, high = min(values), max(values)
+    high = high if high > low else low + 1
+    points = " ".join(f"{(t - t0) / (t1 - t0) * width:.1f},{(1 - (v - low) / (high - low)) * (height - 2) + 1:.1f}" for t, v in zip(times, values))
+    return f"""
+        <div class="sparkline-container">
+            {value}
+            <svg class="sparkline" width="{width}" height="{height}" viewBox="0 0 {width} {height}">
+                <title>{low:g} – {high:g}</title>
+                <polyline fill="none" stroke="currentColor" stroke-width="1.5" points="{points}" />
+            </svg>
+        </div>
+    """
+
+
+class SparklineRenderer(RendererBase, name="sparkline"):
+    """The current value next to an SVG sparkline of the property's `history`."""
+
+    def __init__(self, settings: Dict[str, Any], history: History | None = None):
+        super().__init__(settings)
+        self.history = history
+        self.resolution = settings.get("resolution", "raw")
+        self.span = float(settings.get("span", 3600))
+        self.width = int(settings.get("width", 160))
+        self.height = int(settings.get("height", 32))
+
+    def samples(self) -> Tuple[list, list]:
+        if self.history is None:
+            return [], []
+        rows = self.history.query(self.resolution, time.time() - self.span)
+        return rows["time"], rows["value" if self.resolution == "raw" else "avg"]
+
+    def render_data(self, data: Any) -> str:
+        return render_sparkline(data, *self.samples(), self.width, self.height)
+
+    def task(self, data: Any) -> Tuple[Any, Tuple[Any, ...]]:
+        # Send the samples in range rather than the whole History
+        return render_sparkline, (data, *self.samples(), self.width, self.height)
+
+
 class ImageRenderer(RendererBase, name="image"):
+    """Shows a small variant inline (see `ImageRepo`) and loads full size on click."""
+
     def __init__(self, settings: Dict[str, Any]):
         super().__init__(settings)
         self.folding = settings.get("folding", True)
+        self.variant = settings.get("variant", "thumbnail")
+        self.sizes = settings.get("sizes", "(max-width: 600px) 100vw, 480px")
+
+    def render_data(self, data: ImageRef | None) -> str:
+        if data is None:
+            return "<div class='value'>No image</div>"
+        thumbnail = data.variants.get(self.variant)
+        srcset = ", ".join(f"/{variant.url} {variant.width}w" for variant in data.variants.values() if variant.width)
+        srcset_attributes = f"srcset='{srcset}' sizes='{self.sizes}'" if srcset else ""
 
-    def render_data(self, data: ImageRef) -> str:
         return f"""
-            <img 
-                src='/{data.url}?{uuid.uuid4().hex}' 
-                class='screenshot-img' 
-                onclick="this.classList.toggle('fullsize'); document.getElementById('lightbox-overlay').classList.toggle('active');"
-                alt="Screenshot" 
+            <img
+                src='/{thumbnail.url if thumbnail else data.url}'
+                {srcset_attributes}
+                data-full='/{data.url}'
+                class='screenshot-img'
+                onclick="toggleLightbox(this);"
+                alt="Screenshot"
             />
         """
 
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from frame.parsers import make_parser
+from frame.values import ValueBase
+from frame.writers import file_writers
+
+
+class Recorder:
+    """Captures the raw output of every fetch, before parsing, for later replay.
+
+    Configured under `settings.record`, e.g. `{path: recordings, properties: [cpu, log]}`;
+    each property is written to `<path>/<name>.jsonl` as `{"t": ..., "raw": ...}` lines.
+    Only getters that separate fetching from parsing (e.g. `shell`) can be recorded."""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.directory = settings.get("path")
+        self.properties = set(settings["properties"]) if settings.get("properties") else None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def records(self, name: str) -> bool:
+        return bool(self.directory) and (self.properties is None or name in self.properties)
+
+    def record(self, name: str, raw: Any):
+        file_writers.write(os.path.join(self.directory, f"{name}.jsonl"), json.dumps({"t": time.time(), "raw": raw}, default=str) + "\n")
+
+
+class ReplayValue(ValueBase, name="replay"):
+    """Plays back a recording made by `Recorder`, pushing each value at its recorded
+    time divided by `speed`, through the same kind of `parser` as the original getter."""
+
+    def __init__(self, settings, config, name):
+        settings["renderer"] = settings.get("renderer", "string")
+        super().__init__(settings)
+        self.config = config
+        self.property_name = name
+        self.path = settings["path"]
+        self.speed = float(settings.get("speed", 1))
+        self.loop = settings.get("loop", True)
+        self.parser, _ = make_parser(settings.get("parser", "string"))
+        self.value = None
+        self.task: asyncio.Task[None] | None = None
+
+    def load(self) -> List[Dict[str, Any]]:
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    async def play(self):
+        records = await asyncio.to_thread(self.load)
+        if not records:
+            return
+
+        while True:
+            start, first = time.monotonic(), records[0]["t"]
+            for record in records:
+                delay = start + (record["t"] - first) / self.speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.value = await self.parser.offload.run(self.parser, record["raw"], len(record["raw"]), self.parser.task)
+                with self.config.mutable() as m:
+                    m[self.property_name] = self.value
+            if not self.loop:
+                return
+            # Leave one average interval between the end of the recording and its restart
+            await asyncio.sleep((records[-1]["t"] - first) / len(records) / self.speed or 1)
+
+    async def get(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.play())
+        return self.value
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
@@ -1,10 +1,36 @@
-from functools import singledispatch
 import asyncio
 import os
-from typing import List, Union
+import signal
+from typing import AsyncIterator, List, Union
 
+from frame.metrics import metrics
 
-async def run_command_str(value: str, sudo: bool = False):
+running_processes = 0
+metrics.gauge("frame_subprocesses_running", lambda: running_processes)
+
+
+def kill_process_group(process: asyncio.subprocess.Process, sig: int = signal.SIGTERM):
+    """Signal every process started by `process`, e.g. the children of a shell pipeline."""
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def communicate(process: asyncio.subprocess.Process) -> tuple[bytes, bytes]:
+    global running_processes
+    metrics.count("frame_subprocesses_total")
+    running_processes += 1
+    try:
+        return await process.communicate()
+    except asyncio.CancelledError:
+        kill_process_group(process)
+        raise
+    finally:
+        running_processes -= 1
+
+
+async def start_command_str(value: str, sudo: bool = False) -> asyncio.subprocess.Process:
     if sudo:
         sudo_password = os.environ.get("SUDO_PASSWORD")
         if sudo_password:
@@ -15,21 +41,16 @@ async def run_command_str(value: str, sudo: bool = False):
             command = f"sudo {value}"
     else:
         command = value
-        
-    process = await asyncio.create_subprocess_shell(
+
+    return await asyncio.create_subprocess_shell(
         command,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
     )
-    stdout, stderr = await process.communicate()
-
-    if process.returncode != 0:
-        raise Exception(stderr.decode())
-
-    return stdout.decode()
 
 
-async def run_command_list(value: List[str], sudo: bool = False):
+async def start_command_list(value: List[str], sudo: bool = False) -> asyncio.subprocess.Process:
     if sudo:
         sudo_password = os.environ.get("SUDO_PASSWORD")
         if sudo_password:
@@ -40,22 +61,39 @@ async def run_command_list(value: List[str], sudo: bool = False):
                 command,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
             )
         else:
             # Use exec mode with sudo prepended
             process = await asyncio.create_subprocess_exec(
-                "sudo", *value,
+                "sudo",
+                *value,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
             )
     else:
         process = await asyncio.create_subprocess_exec(
             *value,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
         )
-        
-    stdout, stderr = await process.communicate()
+
+    return process
+
+
+async def start_command(command: Union[str, List[str]], sudo: bool = False) -> asyncio.subprocess.Process:
+    if isinstance(command, str):
+        return await start_command_str(command, sudo=sudo)
+    elif isinstance(command, list):
+        return await start_command_list(command, sudo=sudo)
+    raise TypeError(f"Invalid command: {command!r}")
+
+
+async def run_command(command: Union[str, List[str]], sudo: bool = False):
+    process = await start_command(command, sudo=sudo)
+    stdout, stderr = await communicate(process)
 
     if process.returncode != 0:
         raise Exception(stderr.decode())
@@ -63,8 +101,25 @@ async def run_command_list(value: List[str], sudo: bool = False):
     return stdout.decode()
 
 
-async def run_command(command: Union[str, List[str]], sudo: bool = False):
-    if isinstance(command, str):
-        return await run_command_str(command, sudo=sudo)
-    elif isinstance(command, list):
-        return await run_command_list(command, sudo=sudo)
+async def stream_command(command: Union[str, List[str]], sudo: bool = False) -> AsyncIterator[str]:
+    """Yield the command's stdout line by line (without line endings) as it is produced.
+
+    Closing the generator early (e.g. once a parser has what it needs) kills the command."""
+    global running_processes
+    process = await start_command(command, sudo=sudo)
+    metrics.count("frame_subprocesses_total")
+    running_processes += 1
+    # Drained alongside stdout: a command filling the stderr pipe would otherwise block forever
+    stderr = asyncio.ensure_future(process.stderr.read())
+    try:
+        async for line in process.stdout:
+            yield line.decode().rstrip("\r\n")
+
+        if await process.wait() != 0:
+            raise Exception((await stderr).decode())
+    finally:
+        running_processes -= 1
+        if process.returncode is None:
+            kill_process_group(process)
+            await process.wait()
+        stderr.cancel()
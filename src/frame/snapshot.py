@@ -0,0 +1,170 @@
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from frame.images import ImageRef, image_repo
+from frame.utility import private_directory
+
+if TYPE_CHECKING:
+    from frame.model import Config
+
+SNAPSHOT_VERSION = 2
+
+
+def encode_value(value: Any) -> Any:
+    if isinstance(value, ImageRef):
+        return {
+            "__image__": value.id,
+            "path": value.path,
+            "hash": value.hash,
+            "width": value.width,
+            "variants": {name: encode_value(variant) for name, variant in value.variants.items()},
+        }
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not snapshotted")
+
+
+def decode_value(value: Dict[str, Any]) -> Any:
+    if "__image__" not in value:
+        return value
+
+    ref = ImageRef(value["__image__"], value["path"], value["hash"])
+    ref.width = value["width"]
+    ref.size = os.path.getsize(ref.path) if os.path.exists(ref.path) else 0
+    # Variants were decoded first (innermost objects come first), so only parents need linking
+    for name, variant in value["variants"].items():
+        if os.path.exists(variant.path):
+            variant.parent = ref
+            ref.variants[name] = variant
+    return ref
+
+
+class Snapshot:
+    """Periodically saves the Config's state and rendered frames, so a restart can serve
+    the last-known values straight away while fresh ones are fetched.
+
+    Only the runner writes snapshots. Values are restored only for properties whose
+    description is unchanged since the snapshot was taken."""
+
+    def __init__(self, config: "Config", name: str, settings: Dict[str, Any]):
+        self.config = config
+        self.enabled = settings.get("enabled", True)
+        self.name = name
+        self.path = settings.get("path")
+        self.interval = float(settings.get("interval", 5))
+        self.saved_state: Dict[str, Any] | None = None
+        self.task: asyncio.Task[None] | None = None
+
+    def descriptions(self) -> Dict[str, str]:
+        return {name: repr(delegate.desc) for name, delegate in self.config.delegates.items()}
+
+    def default_path(self) -> str:
+        digest = hashlib.sha1(f"{os.getcwd()}:{self.name}".encode()).hexdigest()[:8]
+        return os.path.join(private_directory(), f"{digest}.snapshot.json")
+
+    def load(self) -> Dict[str, Any] | None:
+        try:
+            with open(self.path, "r") as f:
+                snapshot = json.load(f, object_hook=decode_value)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot {self.path}: {e!r}")
+            return None
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return None
+        return snapshot
+
+    def restore(self) -> List[str]:
+        """Load the last snapshot into the Config; returns the names of the restored properties."""
+        if not self.enabled:
+            return []
+        if self.path is None:
+            try:
+                self.path = self.default_path()
+            except OSError as e:
+                print(f"Snapshots disabled: {e}")
+                self.enabled = False
+                return []
+        snapshot = self.load()
+        if snapshot is None:
+            return []
+
+        descriptions = self.descriptions()
+        values: Dict[str, Any] = {}
+        for name, value in snapshot["state"].items():
+            if snapshot["descriptions"].get(name) != descriptions.get(name) or value is None:
+                continue
+            # Images live in a temporary directory, so they rarely survive a restart
+            if isinstance(value, ImageRef) and not os.path.exists(value.path):
+                continue
+            values[name] = value
+
+        for value in values.values():
+            # Register restored images so their URLs are served again
+            if isinstance(value, ImageRef):
+                image_repo.adopt(value)
+        with self.config.mutable() as m:
+            m.update(values)
+        for name in values:
+            if name in snapshot["rendered"]:
+                self.config.rendered[name] = snapshot["rendered"][name]
+        self.config.stale.update(values)
+
+        print(f"Restored {len(values)} values from {self.path} ({time.time() - snapshot['time']:.0f}s old)")
+        return list(values)
+
+    def start(self):
+        if self.enabled and self.path is not None and self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+            atexit.register(self.save)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # Every update replaces config.state, so identity is enough to spot changes
+            if self.config.state is not self.saved_state:
+                state = self.config.state
+                await asyncio.to_thread(self.write, self.payload(state, dict(self.config.rendered)))
+                self.saved_state = state
+
+    def save(self):
+        if self.task is not None and self.config.state is not self.saved_state:
+            self.write(self.payload(self.config.state, dict(self.config.rendered)))
+            self.saved_state = self.config.state
+
+    def payload(self, state: Dict[str, Any], rendered: Dict[str, str]) -> Dict[str, Any]:
+        """The snapshot to write. Built on the event loop, as it reads the Config."""
+        return {
+            "version": SNAPSHOT_VERSION,
+            "time": time.time(),
+            "descriptions": self.descriptions(),
+            "state": {name: value for name, value in state.items() if name in self.config.delegates},
+            "rendered": rendered,
+        }
+
+    def write(self, snapshot: Dict[str, Any]):
+        """Serialize and save a `payload`; touches nothing else, so it can run in a thread."""
+        values: Dict[str, Any] = {}
+        for name, value in snapshot["state"].items():
+            try:
+                json.dumps(value, default=encode_value)
+            except (TypeError, ValueError):
+                # Values JSON can't represent just aren't restored
+                continue
+            values[name] = value
+
+        try:
+            data = json.dumps({**snapshot, "state": values}, default=encode_value)
+            fd = os.open(self.path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(self.path + ".tmp", self.path)
+        except Exception as e:
+            print(f"Failed to write snapshot {self.path}: {e!r}")
@@ -51,6 +51,16 @@ function setupImageHandlers() {
     });
 }
 
+function toggleLightbox(img) {
+    // Thumbnails are shown inline; only fetch the full-size image when opened
+    if (!img.classList.contains('fullsize') && img.dataset.full) {
+        img.removeAttribute('srcset');
+        img.src = img.dataset.full;
+    }
+    img.classList.toggle('fullsize');
+    document.getElementById('lightbox-overlay').classList.toggle('active');
+}
+
 function toggleSection(path, id) {
     const container = document.getElementById(id);
     const wasExpanded = container.classList.contains('expanded');
@@ -1,4 +1,9 @@
+import asyncio
 import os
+import stat
+import tempfile
+import time
+from typing import Any, Callable, Dict, Tuple
 
 
 def tail_lines(filepath: str, num_lines=100) -> str:
@@ -20,3 +25,91 @@ def tail_lines(filepath: str, num_lines=100) -> str:
 
     # Reverse the buffer, convert to bytes, and decode to string
     return bytes(reversed(buffer)).decode("utf-8", errors="replace")
+
+
+def private_directory() -> str:
+    """A directory under the system temp dir that only the current user can access.
+
+    Raises PermissionError if it already exists but is owned by someone else or is
+    readable by other users, since its contents are trusted."""
+    path = os.path.join(tempfile.gettempdir(), f"frame-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory private to uid {os.getuid()}")
+    return path
+
+
+class Throttle:
+    """Calls `callback` at most `rate` times per second.
+
+    Values arriving too quickly are held back and only the most recent one is delivered
+    once the interval has elapsed, so the final value of a burst is never lost."""
+
+    def __init__(self, rate: float | None, callback: Callable[[Any], None]):
+        self.interval = 1.0 / float(rate) if rate else 0.0
+        self.callback = callback
+        self.last_time = 0.0
+        self.pending: Any = None
+        self.timer: asyncio.TimerHandle | None = None
+
+    def __call__(self, value: Any):
+        if self.timer is not None:
+            self.pending = value
+            return
+
+        now = time.monotonic()
+        wait = self.last_time + self.interval - now
+        if wait <= 0:
+            self.last_time = now
+            self.callback(value)
+        else:
+            self.pending = value
+            self.timer = asyncio.get_running_loop().call_later(wait, self.flush)
+
+    def flush(self):
+        self.timer = None
+        self.last_time = time.monotonic()
+        value, self.pending = self.pending, None
+        self.callback(value)
+
+    def cancel(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self.pending = None
+
+
+class CoalescingQueue:
+    """A queue holding at most one pending item per key.
+
+    Putting a key that is already pending replaces its value in place, so a consumer that
+    falls behind only ever sees the latest value for each key and the queue stays bounded."""
+
+    def __init__(self):
+        self.items: Dict[str, Any] = {}
+        self.event = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def put(self, key: str, value: Any):
+        self.items[key] = value
+        self.event.set()
+
+    async def get(self) -> Tuple[str, Any]:
+        while not self.items:
+            self.event.clear()
+            await self.event.wait()
+
+        key = next(iter(self.items))
+        return key, self.items.pop(key)
+
+    async def get_all(self) -> Dict[str, Any]:
+        """Wait for at least one item, then take everything pending."""
+        while not self.items:
+            self.event.clear()
+            await self.event.wait()
+
+        items, self.items = self.items, {}
+        return items
@@ -1,16 +1,30 @@
+import asyncio
+from contextlib import aclosing
 from enum import Enum
-from typing import Any, Dict
+import hashlib
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List
 
+from frame.history import History
 from frame.images import image_repo
+from frame.metrics import metrics
+from frame.osc import osc_server
 from frame.parsers import make_parser
 from frame.registry import TypeRegistry
 from frame.renderers import RendererBase, make_renderer
-from frame.shell import run_command
-from frame.utility import tail_lines
+from frame.shell import run_command, stream_command
+from frame.utility import Throttle, tail_lines
 import os
 
+if TYPE_CHECKING:
+    from frame.model import Config
+
+
 ValueType = Enum("ValueType", [("Get", 1), ("Set", 2)])
 
+# Returned by `ValueDelegate.get` when the raw output matches the previous fetch
+UNCHANGED = object()
+
 
 class ValueBase:
     def __init_subclass__(cls, name: str):
@@ -36,32 +50,116 @@ class ValueDelegate:
     name: str
     display_name: str
     update_time: float | None
+    max_fps: float | None
+    priority: float
+    timeout: float | None
+    history: History | None
     renderer: RendererBase
 
     def __init__(
         self,
         name: str,
         desc: Dict[str, Any],
+        config: "Config",
     ):
         super().__init__()
         self.name = name
+        self.desc = desc
         self.display_name = desc.get("name", name)
         self.update_time = float(desc.get("poll")) if desc.get("poll") else None
+        self.max_fps = float(desc.get("max_fps")) if desc.get("max_fps") else None
+        self.priority = float(desc.get("priority", 0))
+        self.timeout = float(desc.get("timeout")) if desc.get("timeout") else None
 
-        self.getter, get_settings = values.make(desc.get("get"))
+        self.config = config
+        # Size of the last raw output, which decides whether rendering is offloaded
+        self.size = 0
+        # Fingerprint of the last raw output that was parsed successfully
+        self.fingerprint: bytes | None = None
+        self.getter, get_settings = values.make(desc.get("get"), config=config, name=name)
 
         self.updates = get_settings.get("poll", None)
-        self.renderer, _ = make_renderer(desc.get("renderer", "string"))
+        self.history = History(desc["history"]) if desc.get("history") else None
+        self.renderer, _ = make_renderer(desc.get("renderer", "string"), history=self.history)
+
+    def close(self):
+        """Release whatever the getter holds, when the property is removed or rebuilt."""
+        close = getattr(self.getter, "close", None)
+        if close is not None:
+            close()
 
     async def get(self) -> Any:
         if self.getter is None:
             raise NotImplementedError("Getter not implemented")
 
-        return await self.getter.get()
-
-
-def make_value(name: str, value_desc: Dict[str, Any]):
-    return ValueDelegate(name, value_desc)
+        if getattr(self.getter, "streaming", False):
+            return await self.get_streamed()
+
+        # Getters that fetch and parse separately are timed separately, and can be recorded
+        if hasattr(self.getter, "fetch"):
+            with metrics.span("fetch", self.name):
+                raw = await self.getter.fetch()
+            fingerprint = self.take_raw(raw)
+
+            # Polled commands mostly print the same thing again, which needs no parsing,
+            # comparing or rendering
+            if fingerprint == self.fingerprint:
+                metrics.count("frame_fetches_unchanged_total", property=self.name)
+                return UNCHANGED
+            with metrics.span("parse", self.name):
+                value = await self.getter.parse(raw)
+            self.fingerprint = fingerprint
+            return value
+
+        with metrics.span("fetch", self.name):
+            value = await self.getter.get()
+        self.size = len(value) if isinstance(value, str) else 0
+        return value
+
+    async def get_streamed(self) -> Any:
+        """Parse the output while it arrives. Time spent waiting for lines counts as fetch,
+        the rest as parse; what was read is recorded and fingerprinted like fetched output."""
+        lines: List[str] = []
+        waited = 0.0
+
+        async def tee(source: AsyncIterator[str]) -> AsyncIterator[str]:
+            nonlocal waited
+            while True:
+                start = time.perf_counter()
+                try:
+                    line = await anext(source)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    waited += time.perf_counter() - start
+                lines.append(line)
+                yield line
+
+        start = time.perf_counter()
+        async with aclosing(self.getter.lines()) as source, aclosing(tee(source)) as teed:
+            value = await self.getter.parse_stream(teed)
+        metrics.observe("frame_stage_seconds", waited, stage="fetch", property=self.name)
+        metrics.observe("frame_stage_seconds", time.perf_counter() - start - waited, stage="parse", property=self.name)
+
+        fingerprint = self.take_raw("".join(line + "\n" for line in lines))
+        if fingerprint == self.fingerprint:
+            metrics.count("frame_fetches_unchanged_total", property=self.name)
+            return UNCHANGED
+        self.fingerprint = fingerprint
+        return value
+
+    def take_raw(self, raw: str) -> bytes:
+        """Note the size of fetched output, record it if asked to, and fingerprint it."""
+        self.size = len(raw)
+        if self.config.recorder.records(self.name):
+            self.config.recorder.record(self.name, raw)
+        metrics.count("frame_fetches_total", property=self.name)
+        # A real digest: a collision here would silently drop a change
+        return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+
+def make_value(name: str, value_desc: Dict[str, Any], config: "Config"):
+    return ValueDelegate(name, value_desc, config)
 
 
 ############################################################
@@ -74,15 +172,30 @@ class ShellGetter(ValueBase, name="shell"):
         self.command = settings["cmd"]
         self.parser, _ = make_parser(settings.get("parser", "string"))
         self.sudo = settings.get("sudo", False)
+        # Streaming parsers read stdout as it arrives, so there is no raw output to fetch
+        self.streaming = getattr(self.parser, "streaming", False)
+
+    async def fetch(self) -> str:
+        return await run_command(self.command, sudo=self.sudo)
+
+    async def parse(self, raw: str) -> Any:
+        return await self.parser.offload.run(self.parser, raw, len(raw), self.parser.task)
+
+    def lines(self) -> AsyncIterator[str]:
+        return stream_command(self.command, sudo=self.sudo)
+
+    async def parse_stream(self, lines: AsyncIterator[str]) -> Any:
+        return await self.parser.parse_stream(lines)
 
     async def get(self):
-        result_str = await run_command(self.command, sudo=self.sudo)
-        result = self.parser(result_str)
-        return result
+        if self.streaming:
+            async with aclosing(self.lines()) as lines:
+                return await self.parse_stream(lines)
+        return await self.parse(await self.fetch())
 
 
 class ScreenshotGetter(ValueBase, name="screenshot"):
-    def __init__(self, settings):
+    def __init__(self, settings, config, name):
         settings["renderer"] = settings.get("renderer", "image")
         super().__init__(settings)
         self.x = settings.get("x", None)
@@ -90,24 +203,29 @@ class ScreenshotGetter(ValueBase, name="screenshot"):
         self.width = settings.get("width", None)
         self.height = settings.get("height", None)
         self.sudo = settings.get("sudo", False)
-        self.id = "screenshot"
+        self.id = settings.get("id", name)
 
     async def get(self):
-        ref = image_repo.make_image_ref(self.id + ".png")
+        path = image_repo.scratch_path(self.id + ".png")
         if (self.x is not None) and (self.y is not None) and (self.width is not None) and (self.height is not None):
             await run_command(
                 [
                     "screencapture",
                     "-R",
                     f"{self.x},{self.y},{self.width},{self.height}",
-                    ref.path,
+                    path,
                 ],
                 sudo=self.sudo,
             )
-            return ref
         else:
-            await run_command(["screencapture", ref.path], sudo=self.sudo)
-            return ref
+            await run_command(["screencapture", path], sudo=self.sudo)
+
+        # Identical captures resolve to the same ref, so an unchanged screen produces no update.
+        # Refs are shared by content, so old captures are left to ImageRepo.evict, which
+        # keeps the ones still in use.
+        ref = await asyncio.to_thread(image_repo.add_file, path)
+        await image_repo.make_variants(ref)
+        return ref
 
 
 class Tail(ValueBase, name="tail"):
@@ -128,3 +246,43 @@ class Tail(ValueBase, name="tail"):
             self.last_value = tail_lines(self.path, self.lines)
 
         return self.last_value
+
+
+class OSCValue(ValueBase, name="osc"):
+    """Pushed by incoming OSC messages rather than polled."""
+
+    def __init__(self, settings, config, name):
+        settings["renderer"] = settings.get("renderer", "string")
+        super().__init__(settings)
+        self.config = config
+        self.property_name = name
+        self.address = settings["address"]
+        self.index = settings.get("index", None)
+        self.value = settings.get("default", None)
+        self.throttle = Throttle(settings.get("rate", None), self.push)
+        self.mapping = osc_server.map(self.address, self.receive)
+
+    def receive(self, address: str, args: tuple):
+        if self.index is not None:
+            if not -len(args) <= self.index < len(args):
+                print(f"Ignoring {address} for {self.property_name}: no argument {self.index} in {args!r}")
+                return
+            self.value = args[self.index]
+        elif len(args) == 1:
+            self.value = args[0]
+        else:
+            self.value = list(args)
+
+        self.throttle(self.value)
+
+    def push(self, value: Any):
+        with self.config.mutable() as m:
+            m[self.property_name] = value
+
+    async def get(self):
+        await osc_server.start()
+        return self.value
+
+    def close(self):
+        osc_server.unmap(self.address, self.mapping)
+        self.throttle.cancel()
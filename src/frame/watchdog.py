@@ -0,0 +1,145 @@
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List
+
+from frame.metrics import metrics
+
+# What the current task is working on, e.g. "property:cpu" or "action:reset"
+activity: ContextVar[str | None] = ContextVar("frame_activity", default=None)
+
+
+def describe_handle(handle: asyncio.Handle) -> str:
+    callback = handle._callback
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return getattr(coro, "__qualname__", repr(coro))
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+class LoopMonitor:
+    """Watches the event loop for synchronous work that holds it up.
+
+    A heartbeat task measures scheduling lag. With `callbacks: true`, every callback the
+    loop runs is also timed, and those over `threshold` are kept with the property /
+    action they were working for; a watchdog thread grabs the loop thread's stack while a
+    callback is still running past the threshold, so the record shows where the time
+    went. Callback timing patches `asyncio.Handle._run`, so it's off by default, only
+    works on the stock asyncio loop (not uvloop) and is undone by `stop()`. Configured
+    under `settings.loop_monitor`."""
+
+    def __init__(self):
+        self.configure({})
+        self.lags: deque[float] = deque(maxlen=600)
+        self.slow: deque[Dict[str, Any]] = deque(maxlen=50)
+        self.current: asyncio.Handle | None = None
+        self.current_start = 0.0
+        self.stack: tuple[asyncio.Handle, List[str]] | None = None
+        self.thread_id: int | None = None
+        self.task: asyncio.Task[None] | None = None
+        self.original_run: Callable[[asyncio.Handle], None] | None = None
+        self.stopped = threading.Event()
+
+    def configure(self, settings: Dict[str, Any]):
+        self.enabled = settings.get("enabled", True)
+        self.callbacks = settings.get("callbacks", False)
+        self.interval = float(settings.get("interval", 0.1))
+        self.threshold = float(settings.get("threshold", 0.1))
+
+    def start(self):
+        if not self.enabled or self.task is not None:
+            return
+
+        self.thread_id = threading.get_ident()
+        self.task = asyncio.ensure_future(self.heartbeat())
+        if not self.callbacks:
+            return
+        if not isinstance(asyncio.get_running_loop(), asyncio.BaseEventLoop):
+            print("Loop monitor: callback timing needs the standard asyncio event loop; only measuring lag")
+            return
+        self.install()
+        self.stopped.clear()
+        threading.Thread(target=self.watch, name="frame-loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.original_run is not None:
+            asyncio.Handle._run = self.original_run
+            self.original_run = None
+        self.stopped.set()
+
+    async def heartbeat(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.lags.append(lag)
+            metrics.observe("frame_loop_lag_seconds", lag)
+
+    def install(self):
+        """Time every callback by wrapping `Handle._run`, which the loop calls for each one."""
+        monitor = self
+        run = self.original_run = asyncio.Handle._run
+
+        def timed_run(handle: asyncio.Handle):
+            start = time.perf_counter()
+            monitor.current, monitor.current_start = handle, start
+            try:
+                run(handle)
+            finally:
+                monitor.current = None
+                elapsed = time.perf_counter() - start
+                if elapsed > monitor.threshold:
+                    monitor.record(handle, elapsed)
+
+        asyncio.Handle._run = timed_run
+
+    def watch(self):
+        while not self.stopped.wait(self.threshold / 2):
+            handle = self.current
+            if handle is None or time.perf_counter() - self.current_start < self.threshold:
+                continue
+            if self.stack is not None and self.stack[0] is handle:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stack = (handle, traceback.format_stack(frame, limit=20))
+
+    def record(self, handle: asyncio.Handle, elapsed: float):
+        context = handle._context.get(activity) if handle._context is not None else None
+        entry = {
+            "time": time.time(),
+            "duration": elapsed,
+            "callback": describe_handle(handle),
+            "context": context,
+            "stack": self.stack[1] if self.stack is not None and self.stack[0] is handle else None,
+        }
+        self.slow.append(entry)
+        metrics.count("frame_slow_callbacks_total")
+        print(f"Slow callback {entry['callback']}{f' ({context})' if context else ''} blocked the event loop for {elapsed * 1000:.0f}ms")
+
+    def stats(self) -> Dict[str, Any]:
+        lags = sorted(self.lags)
+        return {
+            "lag": {
+                "last": self.lags[-1] if self.lags else None,
+                "p50": lags[len(lags) // 2] if lags else None,
+                "p99": lags[min(len(lags) - 1, len(lags) * 99 // 100)] if lags else None,
+                "max": lags[-1] if lags else None,
+            },
+            "threshold": self.threshold,
+            "timing_callbacks": self.original_run is not None,
+            "slow_callbacks": list(reversed(self.slow)),
+        }
+
+
+loop_monitor = LoopMonitor()
+metrics.describe("frame_loop_lag_seconds", "How late the event loop ran a timer scheduled for now")
+metrics.describe("frame_slow_callbacks_total", "Event loop callbacks that ran longer than the loop monitor threshold")
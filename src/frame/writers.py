@@ -0,0 +1,246 @@
+import atexit
+from concurrent.futures import Future
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, TextIO
+
+
+class FileWriter:
+    """Buffers writes to a single path behind one persistent handle.
+
+    Only ever used from the writer thread, so it needs no locking of its own."""
+
+    handle: TextIO | None
+
+    def __init__(self, path: str, settings: Dict[str, Any]):
+        self.path = path
+        self.handle = None
+        self.buffer: List[str] = []
+        self.buffered = 0
+        self.waiters: List[Future[None]] = []
+        self.first_buffered = 0.0
+        self.last_fsync = time.monotonic()
+        self.dirty = False
+        # How many `WriterThread.configure` calls haven't been released yet
+        self.users = 0
+        self.configure(settings)
+
+    def configure(self, settings: Dict[str, Any]):
+        self.flush_bytes = int(settings.get("flush_bytes", 64 * 1024))
+        self.flush_interval = float(settings.get("flush_interval", 1.0))
+        self.fsync_interval = float(settings["fsync_interval"]) if settings.get("fsync_interval") is not None else None
+        self.rotate_bytes = int(settings["rotate_bytes"]) if settings.get("rotate_bytes") else None
+        self.rotate_keep = int(settings.get("rotate_keep", 5))
+
+    def open(self) -> TextIO:
+        if self.handle is None:
+            self.handle = open(self.path, "a")
+        return self.handle
+
+    def append(self, content: str, future: Future[None]):
+        if not self.buffer:
+            self.first_buffered = time.monotonic()
+        self.buffer.append(content)
+        self.buffered += len(content)
+        self.waiters.append(future)
+
+        if self.buffered >= self.flush_bytes:
+            self.flush()
+
+    def overwrite(self, content: str, future: Future[None]):
+        self.flush()
+        handle = self.open()
+        handle.seek(0)
+        handle.truncate()
+        handle.write(content)
+        handle.flush()
+        self.dirty = True
+        future.set_result(None)
+
+    def next_deadline(self) -> float | None:
+        deadlines = []
+        if self.buffer:
+            deadlines.append(self.first_buffered + self.flush_interval)
+        if self.dirty and self.fsync_interval is not None:
+            deadlines.append(self.last_fsync + self.fsync_interval)
+        return min(deadlines) if deadlines else None
+
+    def tick(self, now: float):
+        if self.buffer and now >= self.first_buffered + self.flush_interval:
+            self.flush()
+        if self.dirty and self.fsync_interval is not None and now >= self.last_fsync + self.fsync_interval:
+            self.fsync()
+
+    def flush(self):
+        if not self.buffer:
+            return
+
+        content = "".join(self.buffer)
+        waiters = self.waiters
+        self.buffer, self.buffered, self.waiters = [], 0, []
+
+        try:
+            handle = self.open()
+            # rotate_bytes counts bytes on disk, not characters
+            if self.rotate_bytes is not None and handle.tell() > 0 and handle.tell() + len(content.encode()) > self.rotate_bytes:
+                self.rotate()
+                handle = self.open()
+            handle.write(content)
+            handle.flush()
+            self.dirty = True
+        except Exception as e:
+            print(f"Error writing {self.path}: {e}")
+            for waiter in waiters:
+                waiter.set_exception(e)
+        else:
+            for waiter in waiters:
+                waiter.set_result(None)
+
+    def fsync(self):
+        # Set first, so a failing fsync is retried after the interval rather than at once
+        self.last_fsync = time.monotonic()
+        if self.handle is not None:
+            os.fsync(self.handle.fileno())
+        self.dirty = False
+
+    def rotate(self):
+        self.close()
+        for i in range(self.rotate_keep - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.rotate_keep > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self):
+        self.flush()
+        if self.handle is not None:
+            try:
+                if self.fsync_interval is not None:
+                    self.fsync()
+            finally:
+                self.handle.close()
+                self.handle = None
+
+
+class WriterThread:
+    """Serializes all buffered file writes through one dedicated thread.
+
+    Requests are handled strictly in submission order, so concurrent callers writing
+    to the same path can never interleave or reorder their content."""
+
+    def __init__(self):
+        self.queue: queue.Queue[tuple[str, str, Any, Future[None] | None]] = queue.Queue()
+        self.writers: Dict[str, FileWriter] = {}
+        self.thread: threading.Thread | None = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="frame-writer", daemon=True)
+                self.thread.start()
+
+    def configure(self, path: str, settings: Dict[str, Any]):
+        self.start()
+        self.queue.put(("configure", path, settings, None))
+
+    def write(self, path: str, content: str, append: bool = True) -> Future[None]:
+        self.start()
+        future: Future[None] = Future()
+        self.queue.put(("append" if append else "overwrite", path, content, future))
+        return future
+
+    def flush(self, path: str | None = None) -> Future[None]:
+        self.start()
+        future: Future[None] = Future()
+        self.queue.put(("flush", path, None, future))
+        return future
+
+    def call(self, function: Callable[[], Any]) -> Future[None]:
+        """Run `function` on the writer thread, after every request queued before it.
+
+        For filesystem work that has to stay in order with the writes, like creating
+        a directory or removing old files, without blocking the caller."""
+        self.start()
+        future: Future[None] = Future()
+        self.queue.put(("call", "", function, future))
+        return future
+
+    def release(self, path: str):
+        """Undo one `configure` of `path`; the last release flushes and closes it, forgetting its writer."""
+        self.start()
+        self.queue.put(("release", path, None, None))
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(("close", "", None, None))
+            self.thread.join()
+            self.thread = None
+
+    def writer(self, path: str) -> FileWriter:
+        writer = self.writers.get(path)
+        if writer is None:
+            writer = self.writers[path] = FileWriter(path, {})
+        return writer
+
+    def run(self):
+        while True:
+            deadlines = [deadline for writer in self.writers.values() if (deadline := writer.next_deadline()) is not None]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+            try:
+                command, path, payload, future = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                command = None
+
+            try:
+                if command == "configure":
+                    writer = self.writer(path)
+                    writer.configure(payload)
+                    writer.users += 1
+                elif command == "append":
+                    self.writer(path).append(payload, future)
+                elif command == "overwrite":
+                    self.writer(path).overwrite(payload, future)
+                elif command == "flush":
+                    for writer in self.writers.values() if path is None else [self.writer(path)]:
+                        writer.flush()
+                    future.set_result(None)
+                elif command == "call":
+                    payload()
+                    future.set_result(None)
+                elif command == "release":
+                    writer = self.writers.get(path)
+                    if writer is not None:
+                        writer.users -= 1
+                        if writer.users <= 0:
+                            del self.writers[path]
+                            writer.close()
+                elif command == "close":
+                    for writer in self.writers.values():
+                        try:
+                            writer.close()
+                        except Exception as e:
+                            print(f"Error closing {writer.path}: {e}")
+                    self.writers.clear()
+                    return
+            except Exception as e:
+                print(f"Error handling {command} for {path}: {e}")
+                if future is not None and not future.done():
+                    future.set_exception(e)
+
+            now = time.monotonic()
+            for writer in self.writers.values():
+                # A failing disk mustn't stop the thread: later writes may still succeed
+                try:
+                    writer.tick(now)
+                except Exception as e:
+                    print(f"Error flushing {writer.path}: {e}")
+
+
+file_writers = WriterThread()
+atexit.register(file_writers.close)
@@ -0,0 +1,37 @@
+import copy
+
+import pytest
+
+from frame.model import Config
+
+CONFIG = {
+    "name": "test",
+    "password_hash": "",
+    "settings": {"snapshot": {"enabled": False}, "loop_monitor": {"enabled": False}},
+    "model": {},
+    "actions": {},
+}
+
+
+def describe(model=None, actions=None, **settings) -> dict:
+    """A test config description; snapshots and the loop monitor are off unless overridden."""
+    desc = copy.deepcopy(CONFIG)
+    desc["model"] = copy.deepcopy(model or {})
+    desc["actions"] = copy.deepcopy(actions or {})
+    desc["settings"].update(copy.deepcopy(settings))
+    return desc
+
+
+@pytest.fixture
+def describe_config():
+    return describe
+
+
+@pytest.fixture
+def make_config():
+    def make(model=None, actions=None, **settings) -> Config:
+        config = Config(describe(model, actions, **settings))
+        config.ready.close()
+        return config
+
+    return make
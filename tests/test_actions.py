@@ -0,0 +1,56 @@
+import asyncio
+
+from frame.actions import ActionExecutor, ShellAction
+
+
+def make_executor(**settings) -> ActionExecutor:
+    action = ShellAction({"name": "slow", "cmd": "sleep 0.2; echo done", "concurrency": 1, **settings})
+    return ActionExecutor(lambda name: action)
+
+
+def test_queue_policy_reuses_identical_queued_requests():
+    async def run():
+        executor = make_executor()
+        first = executor.submit("slow", {})
+        assert executor.submit("slow", {}) is first
+        await asyncio.sleep(0.05)
+        # Once the first is running, an identical request queues behind it
+        second = executor.submit("slow", {})
+        assert second is not first
+        assert executor.submit("slow", {}) is second
+        await executor.wait(second)
+        assert [first.status, second.status] == ["done", "done"]
+        assert second.result.strip() == "done"
+        # One at a time: the second only starts once the first command has exited
+        assert second.started - first.started >= 0.15
+
+    asyncio.run(run())
+
+
+def test_drop_policy_refuses_while_busy():
+    async def run():
+        executor = make_executor(on_busy="drop")
+        first = executor.submit("slow", {})
+        dropped = executor.submit("slow", {})
+        assert dropped.status == "dropped" and dropped.task is None
+        await executor.wait(first)
+        assert first.status == "done"
+
+    asyncio.run(run())
+
+
+def test_replace_policy_cancels_the_running_job():
+    async def run():
+        executor = make_executor(on_busy="replace")
+        events = []
+        executor.listeners.append(lambda event, job: events.append((event, job.status)))
+        first = executor.submit("slow", {})
+        await asyncio.sleep(0.05)
+        second = executor.submit("slow", {})
+        await executor.wait(second)
+        assert first.status == "cancelled"
+        assert second.status == "done"
+        assert ("finished", "cancelled") in events and events[-1] == ("finished", "done")
+        assert executor.active["slow"] == []
+
+    asyncio.run(run())
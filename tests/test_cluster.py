@@ -0,0 +1,82 @@
+import asyncio
+import os
+import socket
+
+from frame.cluster import Peer, peer_uid, read_frame
+
+
+async def connected_pair():
+    left, right = socket.socketpair(socket.AF_UNIX)
+    reader, reader_writer = await asyncio.open_unix_connection(sock=left)
+    _, writer = await asyncio.open_unix_connection(sock=right)
+    # Unreferenced StreamWriters close their transport, so the reader's is returned too
+    return reader, reader_writer, writer
+
+
+def test_peer_reports_unpicklable_results_and_keeps_sending():
+    async def run():
+        reader, _reader_writer, writer = await connected_pair()
+        assert peer_uid(writer) in (None, os.getuid())
+
+        peer = Peer(writer)
+        peer.send(("reply", 1, lambda: None, None))
+        peer.send_state({"bad": lambda: None, "good": 1})
+        peer.send(("reply", 2, "ok", None))
+
+        _, request_id, result, error = await read_frame(reader)
+        assert request_id == 1 and result is None and "Could not send result" in error
+        assert await read_frame(reader) == ("reply", 2, "ok", None)
+        assert await read_frame(reader) == ("state", {"good": 1})
+        assert not peer.task.done()
+        peer.close()
+
+    asyncio.run(run())
+
+
+def test_followers_sync_settle_and_take_over(tmp_path, make_config):
+    settings = {"enabled": True, "socket": str(tmp_path / "frame.sock")}
+    # The runner's only value stays None: its fetch times out
+    model = {"slow": {"get": {"type": "shell", "cmd": "sleep 5"}, "timeout": 0.2}}
+
+    async def run():
+        runner = make_config(model, cluster=settings)
+        await asyncio.wait_for(runner.start(), 5)
+        follower = make_config(model, cluster=settings)
+        leads = []
+        follower.fleet.start = lambda: leads.append(follower) or asyncio.sleep(0)
+        await asyncio.wait_for(follower.start(), 5)
+        assert not follower.cluster.runner
+        assert follower.pending == set()
+
+        # A caller giving up leaves nothing behind for the connection cleanup to trip over
+        call = asyncio.ensure_future(follower.get_jobs())
+        await asyncio.sleep(0)
+        call.cancel()
+        await asyncio.sleep(0.05)
+        assert follower.cluster.replies == {}
+
+        # When the runner goes away the follower takes over, fleet included
+        runner.cluster.server.close()
+        for peer in list(runner.cluster.peers):
+            peer.close()
+        runner.cluster.lock_file.close()
+        for _ in range(100):
+            if follower.cluster.runner and leads:
+                break
+            await asyncio.sleep(0.05)
+        assert follower.cluster.runner and leads == [follower]
+
+    asyncio.run(run())
+
+
+def test_followers_of_an_empty_runner_start(tmp_path, make_config):
+    settings = {"enabled": True, "socket": str(tmp_path / "frame.sock")}
+
+    async def run():
+        runner = make_config(cluster=settings)
+        await asyncio.wait_for(runner.start(), 5)
+        follower = make_config(cluster=settings)
+        await asyncio.wait_for(follower.start(), 5)
+        assert runner.cluster.runner and not follower.cluster.runner
+
+    asyncio.run(run())
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from frame.config import cache_path, load_config
+from frame.registry import TypeRegistry
+
+
+def test_load_config_caches_as_json(tmp_path):
+    path = tmp_path / "frame.yaml"
+    path.write_text("name: test\nmodel:\n  b: {get: {type: shell, cmd: echo b}}\n  a: {get: {type: shell, cmd: echo a}}\n")
+
+    first = load_config(str(path))
+    with open(cache_path(str(path))) as f:
+        assert f.read().startswith("{")
+    second = load_config(str(path))
+    assert second == first
+    assert list(second["model"]) == ["b", "a"]
+
+    path.write_text("name: edited\n")
+    assert load_config(str(path)) == {"name": "edited"}
+
+
+def test_load_config_skips_cache_for_non_json_values(tmp_path):
+    path = tmp_path / "frame.yaml"
+    path.write_text("name: test\nlevels: {1: low, 2: high}\n")
+
+    assert load_config(str(path))["levels"] == {1: "low", 2: "high"}
+    assert not os.path.exists(cache_path(str(path)))
+    assert load_config(str(path))["levels"] == {1: "low", 2: "high"}
+
+
+def test_registry_resolves_refs_once_until_they_change():
+    registry = TypeRegistry[dict]("test-things")
+    registry.register("base", lambda settings: settings)
+    registry.register_ref("loud", {"type": "base", "volume": 11})
+    registry.register_ref("louder", {"type": "loud", "echo": True})
+
+    first, _ = registry.make("louder")
+    assert (first["type"], first["volume"], first["echo"]) == ("base", 11, True)
+    assert registry.resolve("louder") is registry.resolve("louder")
+
+    # Instances get their own copy of the shared settings
+    first["volume"] = 0
+    assert registry.make("louder")[0]["volume"] == 11
+
+    registry.register_ref("loud", {"type": "base", "volume": 5, "bass": True})
+    assert registry.make("louder")[0]["bass"] is True
+
+    registry.register_ref("base", {"type": "louder"})
+    with pytest.raises(ValueError, match="Circular"):
+        registry.resolve("louder")
@@ -0,0 +1,34 @@
+import asyncio
+import json
+
+import httpx
+
+from frame.fleet import RemoteAgent
+
+MODEL = {"type": "model", "name": "agent", "properties": [{"name": "cpu", "display_name": "CPU", "renderer": "string"}], "actions": []}
+
+
+def test_remote_agent_reconnects_after_a_malformed_message(make_config):
+    async def run():
+        config = make_config()
+        connections = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal connections
+            connections += 1
+            if connections == 1:
+                # A state message without its timestamp
+                return httpx.Response(200, text=json.dumps({"type": "state", "values": {}}) + "\n")
+            lines = [MODEL, {"type": "state", "ts": 0, "values": {"cpu": "12"}}]
+            return httpx.Response(200, text="".join(json.dumps(line) + "\n" for line in lines))
+
+        agent = RemoteAgent(config, "remote", {"url": "http://agent", "token": "secret"})
+        agent.client = httpx.AsyncClient(base_url=agent.url, transport=httpx.MockTransport(handler))
+        await asyncio.wait_for(agent.start(), 5)
+        await asyncio.sleep(0.1)
+        agent.task.cancel()
+
+        assert connections == 2
+        assert config.state["remote.cpu"] == "12"
+
+    asyncio.run(run())
@@ -0,0 +1,34 @@
+import pytest
+
+from frame.history import History, Ring, numeric
+
+
+def test_numeric_reads_leading_numbers():
+    assert numeric("12.5%") == 12.5
+    assert numeric(True) == 1.0
+    assert numeric("load") is None
+    assert numeric([1]) is None
+
+
+def test_ring_keeps_the_newest_rows_in_order():
+    ring = Ring(3, ["time", "value"])
+    for i in range(5):
+        ring.append(i, i * 10)
+    assert ring.rows() == {"time": [2, 3, 4], "value": [20, 30, 40]}
+    assert ring.rows(since=3)["value"] == [30, 40]
+
+
+def test_history_downsamples_into_minutes_and_fills_gaps():
+    history = History({"raw": 10, "key": "load"})
+    for t, value in [(0, 1), (30, 3), (60, 5), (185, 7)]:
+        history.add({"load": value}, now=t)
+    history.add({"load": "n/a"}, now=190)
+
+    assert history.query("raw")["value"] == [1, 3, 5, 7]
+    minutes = history.query("minute")
+    assert minutes["time"] == [0, 60, 120, 180]
+    assert minutes["avg"] == [2, 5, 5, 7]
+    assert (minutes["min"][0], minutes["max"][0]) == (1, 3)
+
+    with pytest.raises(ValueError):
+        history.query("week")
@@ -0,0 +1,63 @@
+import asyncio
+import os
+
+import pytest
+
+from frame.images import ImageRepo
+from frame.renderers import ImageRenderer
+
+
+def capture(repo: ImageRepo, name: str, data: bytes):
+    path = repo.scratch_path(name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return repo.add_file(path)
+
+
+def test_evict_keeps_images_in_use_and_recently_added():
+    repo = ImageRepo({"variants": {}, "max_bytes": 20})
+    shown = capture(repo, "a.png", b"a" * 10)
+    repeated = capture(repo, "b.png", b"b" * 10)
+    repo.in_use = lambda: [shown]
+
+    # Identical bytes return the stored ref
+    assert capture(repo, "b2.png", b"b" * 10) is repeated
+    capture(repo, "c.png", b"c" * 10)
+
+    assert repo.get_image_ref(shown.id) is shown
+    assert repo.get_image_ref(repeated.id) is None
+    assert repo.evictions == 1
+
+
+def test_add_file_hit_moves_image_to_the_end():
+    repo = ImageRepo({"variants": {}, "max_bytes": 30})
+    first = capture(repo, "a.png", b"a" * 10)
+    capture(repo, "b.png", b"b" * 10)
+    capture(repo, "c.png", b"c" * 10)
+    capture(repo, "a2.png", b"a" * 10)
+    capture(repo, "d.png", b"d" * 10)
+
+    assert repo.get_image_ref(first.id) is first
+    assert repo.evictions == 1
+
+
+def test_variants_are_resized_and_discarded_with_their_image():
+    Image = pytest.importorskip("PIL.Image")
+    repo = ImageRepo({"variants": {"thumbnail": {"width": 40, "format": "jpeg"}, "small": {"width": 20, "format": "webp"}}})
+    path = repo.scratch_path("big.png")
+    Image.new("RGB", (200, 100), "red").save(path)
+    ref = repo.add_file(path)
+
+    asyncio.run(repo.make_variants(ref))
+    thumbnail, small = ref.variants["thumbnail"], ref.variants["small"]
+    with Image.open(thumbnail.path) as image:
+        assert (image.format, image.size) == ("JPEG", (40, 20))
+    assert small.path.endswith(".webp") and small.width == 20
+    assert repo.get_image_ref(thumbnail.id) is thumbnail
+
+    rendered = ImageRenderer({}).render_data(ref)
+    assert f"src='/{thumbnail.url}'" in rendered and f"/{small.url} 20w" in rendered
+
+    repo.discard(ref.id)
+    assert repo.get_image_ref(thumbnail.id) is None
+    assert not os.path.exists(thumbnail.path)
@@ -0,0 +1,28 @@
+import json
+import os
+import time
+
+from frame.journal import Journal, JournalReader
+from frame.writers import file_writers
+
+
+def test_journal_prunes_segments_and_their_index_entries(tmp_path, make_config):
+    config = make_config()
+    directory = str(tmp_path / "journal")
+    journal = Journal(config, {"path": directory, "segment_bytes": 200, "index_bytes": 80, "keep": 2})
+
+    journal.start()
+    for i in range(20):
+        journal.record_state({"x": i}, {"x"})
+        # Segment names are millisecond timestamps
+        time.sleep(0.002)
+    file_writers.flush().result()
+
+    segments = sorted(name for name in os.listdir(directory) if name.startswith("segment-"))
+    assert len(segments) == 2
+    with open(os.path.join(directory, "index.jsonl")) as f:
+        assert {json.loads(line)["segment"] for line in f} == set(segments)
+
+    reader = JournalReader(directory)
+    assert reader.segments == segments
+    assert [record["values"]["x"] for record in reader.records()][-1] == 19
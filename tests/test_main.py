@@ -0,0 +1,52 @@
+from fastapi.testclient import TestClient
+
+from frame.images import image_repo
+from frame import main
+from frame.main import app, verify_token_redirect
+
+
+def client() -> TestClient:
+    # Without `with`, the lifespan (and so the config) isn't started
+    app.dependency_overrides[verify_token_redirect] = lambda: None
+    return TestClient(app)
+
+
+def capture(data: bytes):
+    path = image_repo.scratch_path("capture.png")
+    with open(path, "wb") as f:
+        f.write(data)
+    return image_repo.add_file(path)
+
+
+def test_identical_captures_share_one_content_addressed_image():
+    first = capture(b"same pixels")
+    second = capture(b"same pixels")
+    assert second is first
+    assert first.id == first.hash + ".png"
+    assert capture(b"other pixels") != first
+
+
+def test_images_are_served_immutable_with_etags():
+    ref = capture(b"served pixels")
+    http = client()
+
+    response = http.get(f"/images/{ref.id}")
+    assert response.status_code == 200
+    assert response.content == b"served pixels"
+    assert response.headers["etag"] == ref.etag
+    assert "immutable" in response.headers["cache-control"]
+
+    assert http.get(f"/images/{ref.id}", headers={"If-None-Match": ref.etag}).status_code == 304
+    assert http.get("/images/unknown.png").status_code == 404
+
+
+def test_images_support_range_requests():
+    ref = capture(b"0123456789")
+    response = client().get(f"/images/{ref.id}", headers={"Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.content == b"2345"
+
+
+def test_property_fetches_time_out_with_504(make_config, monkeypatch):
+    monkeypatch.setattr(main, "config", make_config({"hang": {"get": {"type": "shell", "cmd": "sleep 5"}, "timeout": 0.2}}))
+    assert client().get("/model/hang").status_code == 504
@@ -0,0 +1,31 @@
+import asyncio
+
+from frame.metrics import Metrics, metrics
+
+
+def test_render_uses_the_prometheus_text_format():
+    registry = Metrics()
+    registry.describe("jobs_total", "Jobs run")
+    registry.count("jobs_total", kind='a"b')
+    registry.gauge("depth", lambda: {(("kind", "sse"),): 3})
+    registry.observe("latency_seconds", 0.003)
+    registry.observe("latency_seconds", 20)
+
+    lines = registry.render().splitlines()
+    assert "# HELP jobs_total Jobs run" in lines
+    assert 'jobs_total{kind="a\\"b"} 1' in lines
+    assert 'depth{kind="sse"} 3' in lines
+    assert 'latency_seconds_bucket{le="0.005"} 1' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert "latency_seconds_count 2" in lines
+
+
+def test_pipeline_stages_are_timed_per_property(make_config):
+    async def run():
+        config = make_config({"traced": {"get": {"type": "shell", "cmd": "echo 1"}}})
+        await config.pull_task("traced")
+        await config.get_rendered("traced")
+
+    asyncio.run(run())
+    stages = {dict(labels).get("stage") for labels in metrics.histograms["frame_stage_seconds"] if dict(labels).get("property") == "traced"}
+    assert {"fetch", "parse", "render"} <= stages
@@ -0,0 +1,37 @@
+import asyncio
+import pickle
+import time
+
+from frame.history import History
+from frame.offload import Offload
+from frame.parsers import make_parser
+from frame.renderers import SparklineRenderer, render_sparkline
+
+
+def test_process_offload_sends_a_plain_function():
+    async def run():
+        parser, _ = make_parser({"type": "regex", "pattern": r"(\d+)", "group": 1, "offload": "process", "offload_threshold": 0})
+        return await parser.offload.run(parser, "cpu 42", 6, parser.task)
+
+    assert asyncio.run(run()) == "42"
+
+
+def test_sparkline_task_sends_samples_not_history():
+    history = History({})
+    for i in range(5):
+        history.add(i, now=time.time() - 5 + i)
+    renderer = SparklineRenderer({"width": 10, "height": 4}, history=history)
+    function, args = renderer.task(3)
+
+    assert function is render_sparkline
+    assert not any(isinstance(arg, History) for arg in args)
+    pickle.dumps(args)
+    assert "<polyline" in function(*args)
+    assert function(*args) == renderer.render_data(3)
+    assert "&lt;b&gt;" in renderer.render_data("<b>")
+
+
+def test_process_mode_without_task_uses_a_thread():
+    offload = Offload({"offload": "process", "offload_threshold": 0})
+    # A lambda can't be pickled, so this only works off-process
+    assert asyncio.run(offload.run(lambda value: value * 2, 21, 1)) == 42
@@ -0,0 +1,52 @@
+import asyncio
+import socket
+
+from pythonosc.udp_client import SimpleUDPClient
+
+from frame.osc import osc_server
+
+
+def free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_osc_messages_are_pushed_into_state(make_config):
+    port = free_udp_port()
+    model = {
+        "level": {"get": {"type": "osc", "address": "/level"}},
+        "second": {"get": {"type": "osc", "address": "/pair", "index": 1, "default": 0}},
+    }
+
+    async def run():
+        config = make_config(model, osc_server={"address": "127.0.0.1", "port": port})
+        seen = []
+        config.subscribe(lambda m: m.get("level"), seen.append, keys=["level"])
+
+        try:
+            assert await config.delegates["second"].getter.get() == 0
+            client = SimpleUDPClient("127.0.0.1", port)
+            client.send_message("/level", 0.5)
+            # Too short for index 1: ignored, and the server keeps going
+            client.send_message("/pair", [1])
+            client.send_message("/pair", [1, 2])
+            for _ in range(100):
+                if config.state.get("second") == 2:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert seen == [0.5]
+            assert config.state["second"] == 2
+            config.delegates["second"].getter.receive("/pair", (3,))
+            assert config.delegates["second"].getter.value == 2
+
+            # Removing the property stops it receiving messages
+            config.delegates["level"].close()
+            client.send_message("/level", 0.75)
+            await asyncio.sleep(0.05)
+            assert config.state["level"] == 0.5
+        finally:
+            osc_server.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from frame.metrics import metrics
+from frame.parsers import make_parser
+from frame.replay import Recorder
+from frame.values import UNCHANGED, ValueDelegate
+
+
+def test_regex_single_match():
+    parser, _ = make_parser({"type": "regex", "pattern": r"(\d+)%", "group": 1})
+    assert parser("cpu 42% used") == "42"
+    with pytest.raises(ValueError):
+        parser("nothing here")
+
+
+def test_regex_list_and_columns():
+    lines = "a 1\nb 2\n"
+    rows, _ = make_parser({"type": "regex", "pattern": r"(\w+) (\d+)", "group": {"name": 1, "n": 2}})
+    assert rows(lines) == [{"name": "a", "n": "1"}, {"name": "b", "n": "2"}]
+    columns, _ = make_parser({"type": "regex", "pattern": r"(\w+) (\d+)", "group": {"name": 1, "n": 2}, "columns": True})
+    assert columns(lines) == {"name": ["a", "b"], "n": ["1", "2"]}
+    numbers, _ = make_parser({"type": "regex", "pattern": r"\d+", "list": True})
+    assert numbers(lines) == ["1", "2"]
+
+
+def delegate(getter) -> ValueDelegate:
+    return ValueDelegate("streamed", {"get": getter}, SimpleNamespace(recorder=Recorder({})))
+
+
+def test_streaming_parse_through_a_delegate():
+    async def run():
+        lines = delegate({"type": "shell", "cmd": "printf 'x 1\\ny 2\\n'", "parser": {"type": "regex", "pattern": r"^(\w) (\d)$", "group": 2, "list": True, "stream": True}})
+        assert await lines.get() == ["1", "2"]
+        assert await lines.get() is UNCHANGED
+
+        # A single match returns without waiting for the rest of the output
+        first = delegate({"type": "shell", "cmd": "echo ready; sleep 30", "parser": {"type": "detect", "pattern": "ready", "stream": True}})
+        assert await asyncio.wait_for(first.get(), 5) is True
+
+    asyncio.run(run())
+    assert metrics.counters["frame_fetches_unchanged_total"][(("property", "streamed"),)] >= 1
@@ -0,0 +1,26 @@
+import threading
+import time
+
+from frame.profiler import collapse, sample_stacks
+
+
+def busy(stop: threading.Event):
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_sample_stacks_collapses_the_chosen_threads():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy, args=(stop,), name="busy-worker")
+    thread.start()
+    try:
+        counts = sample_stacks(0.1, 0.005, [thread.ident])
+    finally:
+        stop.set()
+        thread.join()
+
+    assert counts and all(stack.startswith("busy-worker;") for stack in counts)
+    assert any("busy (test_profiler.py:" in stack for stack in counts)
+
+    lines = collapse(counts).splitlines()
+    assert lines[0].rsplit(" ", 1)[1] == str(counts.most_common(1)[0][1])
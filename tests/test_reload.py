@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+MODEL = {
+    "a": {"get": {"type": "shell", "cmd": "echo a"}},
+    "b": {"get": {"type": "shell", "cmd": "echo b"}},
+}
+
+
+def test_reload_rebuilds_only_changed_properties(make_config, describe_config):
+    async def run():
+        config = make_config(MODEL)
+        with config.mutable() as m:
+            m.update(a="a", b="b")
+        unchanged = config.delegates["b"]
+
+        edited = describe_config(MODEL)
+        edited["model"]["a"]["get"]["cmd"] = "echo A"
+        config.reload(edited)
+
+        assert config.delegates["b"] is unchanged
+        assert config.state["b"] == "b"
+        assert config.state["a"] is None and "a" in config.pending
+        assert config.state_order == ["a", "b"]
+
+    asyncio.run(run())
+
+
+def test_failed_reload_leaves_model_intact(make_config, describe_config):
+    async def run():
+        config = make_config(MODEL)
+        with config.mutable() as m:
+            m.update(a="a", b="b")
+        delegates = dict(config.delegates)
+
+        broken = describe_config(MODEL)
+        broken["model"]["a"]["get"] = {"type": "nosuchtype"}
+        broken["model"]["b"]["get"]["cmd"] = "echo B"
+        with pytest.raises(ValueError):
+            config.reload(broken)
+
+        assert config.delegates == delegates
+        assert config.state == {"a": "a", "b": "b"}
+        assert config.state_order == ["a", "b"]
+
+        # Putting the original file back is a no-op, and a fixed edit applies
+        config.reload(describe_config(MODEL))
+        assert config.delegates == delegates
+        fixed = describe_config(MODEL)
+        fixed["model"]["b"]["get"]["cmd"] = "echo B"
+        config.reload(fixed)
+        assert config.delegates["a"] is delegates["a"]
+        assert config.delegates["b"] is not delegates["b"]
+
+    asyncio.run(run())
+
+
+def test_reload_applies_a_changed_concurrency(make_config, describe_config):
+    action = {"type": "shell", "cmd": "sleep 0.2", "concurrency": 1}
+
+    async def run():
+        config = make_config(actions={"slow": action})
+        await config.executor.wait(config.executor.submit("slow", {}))
+
+        config.reload(describe_config(actions={"slow": {**action, "concurrency": 2}}))
+        jobs = [config.executor.submit("slow", {"n": n}) for n in range(2)]
+        for job in jobs:
+            await config.executor.wait(job)
+        # Both ran at once, rather than one after the other
+        assert abs(jobs[1].started - jobs[0].started) < 0.15
+
+    asyncio.run(run())
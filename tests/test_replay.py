@@ -0,0 +1,30 @@
+import asyncio
+import os
+
+from frame.writers import file_writers
+
+PARSER = {"type": "regex", "pattern": r"(\d+)", "group": 1}
+
+
+def test_recorded_output_replays_through_the_same_parser(tmp_path, make_config):
+    directory = str(tmp_path / "recordings")
+
+    async def run():
+        recording = make_config({"n": {"get": {"type": "shell", "cmd": "echo n=$N", "parser": PARSER}}}, record={"path": directory})
+        for n in ["1", "2", "3"]:
+            os.environ["N"] = n
+            await recording.pull_task("n")
+        file_writers.flush().result()
+
+        replay = make_config({"n": {"get": {"type": "replay", "path": os.path.join(directory, "n.jsonl"), "parser": PARSER, "speed": 100, "loop": False}}})
+        seen = []
+        replay.subscribe(lambda m: m.get("n"), seen.append, keys=["n"])
+        getter = replay.delegates["n"].getter
+        await getter.get()
+        await asyncio.wait_for(getter.task, 5)
+        return seen
+
+    try:
+        assert asyncio.run(run()) == ["1", "2", "3"]
+    finally:
+        os.environ.pop("N", None)
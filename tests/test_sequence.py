@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from frame.actions import SequenceError, make_action
+
+
+def sequence(mode: str, actions, **settings):
+    return make_action(None, "seq", {"type": "sequence", "mode": mode, "actions": actions, **settings})
+
+
+def shell(cmd: str, **settings):
+    return {"type": "shell", "cmd": cmd, **settings}
+
+
+def test_parallel_steps_run_at_once():
+    action = sequence("parallel", [shell("sleep 0.2"), shell("sleep 0.2"), shell("sleep 0.2")])
+    steps = asyncio.run(action.call({}, None))
+    assert [step["status"] for step in steps] == ["done"] * 3
+    assert max(step["start"] for step in steps) < 0.1
+
+
+def test_max_parallel_caps_concurrent_steps():
+    action = sequence("parallel", [shell("sleep 0.1"), shell("sleep 0.1"), shell("sleep 0.1")], max_parallel=1)
+    steps = asyncio.run(action.call({}, None))
+    starts = sorted(step["start"] for step in steps)
+    assert starts[2] - starts[0] >= 0.2
+
+
+def test_graph_runs_steps_after_their_dependencies_and_skips_failed_branches():
+    action = sequence(
+        "graph",
+        [
+            shell("echo a", id="a"),
+            shell("exit 1", id="broken"),
+            shell("echo b", id="b", after="a"),
+            shell("echo c", id="c", after=["b", "broken"]),
+        ],
+    )
+    with pytest.raises(SequenceError) as error:
+        asyncio.run(action.call({}, None))
+
+    steps = {step["step"]: step for step in error.value.result}
+    assert [steps[name]["status"] for name in "a b broken c".split()] == ["done", "done", "failed", "skipped"]
+    assert steps["b"]["start"] >= steps["a"]["start"] + steps["a"]["duration"]
+
+
+def test_graph_rejects_cycles_and_unknown_steps():
+    with pytest.raises(ValueError, match="Circular"):
+        sequence("graph", [shell("true", id="a", after="b"), shell("true", id="b", after="a")])
+    with pytest.raises(ValueError, match="unknown step"):
+        sequence("graph", [shell("true", id="a", after="missing")])
@@ -0,0 +1,39 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from frame.shell import run_command, stream_command
+
+
+async def collect(command: str, limit: int | None = None) -> list[str]:
+    lines = []
+    async with aclosing(stream_command(command)) as stream:
+        async for line in stream:
+            lines.append(line)
+            if limit is not None and len(lines) >= limit:
+                break
+    return lines
+
+
+def test_run_command_returns_stdout():
+    assert asyncio.run(run_command("echo hello")) == "hello\n"
+
+
+def test_stream_command_yields_lines_without_endings():
+    assert asyncio.run(collect("printf 'a\\nb\\n'")) == ["a", "b"]
+
+
+def test_stream_command_survives_a_full_stderr_pipe():
+    lines = asyncio.run(asyncio.wait_for(collect("head -c 1000000 /dev/zero >&2; echo done"), 5))
+    assert lines == ["done"]
+
+
+def test_stream_command_kills_the_command_when_closed_early():
+    lines = asyncio.run(asyncio.wait_for(collect("yes", limit=3), 5))
+    assert lines == ["y", "y", "y"]
+
+
+def test_stream_command_raises_on_failure():
+    with pytest.raises(Exception, match="oops"):
+        asyncio.run(collect("echo out; echo oops >&2; exit 2"))
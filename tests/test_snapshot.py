@@ -0,0 +1,52 @@
+import json
+import os
+import stat
+
+from frame.images import ImageRef, image_repo
+from frame.utility import private_directory
+
+MODEL = {
+    "a": {"get": {"type": "shell", "cmd": "echo a"}},
+    "image": {"get": {"type": "shell", "cmd": "echo image"}},
+}
+
+
+def test_snapshot_round_trips_as_private_json(tmp_path, make_config):
+    image_path = tmp_path / "abc.png"
+    image_path.write_bytes(b"png")
+    ref = ImageRef("snapshot-abc.png", str(image_path), "abc")
+
+    path = str(tmp_path / "snapshot.json")
+    config = make_config(MODEL, snapshot={"path": path})
+    with config.mutable() as m:
+        m.update(a={"values": [1, 2]}, image=ref)
+    config.snapshot.write(config.snapshot.payload(config.state, {"a": "<b>1</b>"}))
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with open(path) as f:
+        assert json.load(f)["state"]["a"] == {"values": [1, 2]}
+
+    restored = make_config(MODEL, snapshot={"path": path})
+    assert sorted(restored.snapshot.restore()) == ["a", "image"]
+    assert restored.state["a"] == {"values": [1, 2]}
+    assert restored.rendered["a"] == "<b>1</b>"
+    # Restored images are registered, so their URLs resolve
+    assert image_repo.get_image_ref("snapshot-abc.png") == restored.state["image"]
+
+
+def test_snapshot_skips_changed_descriptions(tmp_path, make_config):
+    path = str(tmp_path / "snapshot.json")
+    config = make_config(MODEL, snapshot={"path": path})
+    with config.mutable() as m:
+        m.update(a="a")
+    config.snapshot.write(config.snapshot.payload(config.state, {}))
+
+    restored = make_config({"a": {"get": {"type": "shell", "cmd": "echo A"}}}, snapshot={"path": path})
+    assert restored.snapshot.restore() == []
+
+
+def test_private_directory_is_owner_only():
+    path = private_directory()
+    info = os.stat(path)
+    assert info.st_uid == os.getuid()
+    assert stat.S_IMODE(info.st_mode) & 0o077 == 0
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+MODEL = {
+    "hang": {"get": {"type": "shell", "cmd": "sleep 5"}, "timeout": 0.2},
+    "low": {"get": {"type": "shell", "cmd": "echo low"}},
+    "high": {"get": {"type": "shell", "cmd": "echo high"}, "priority": 10},
+}
+
+
+def test_refresh_fetches_by_priority_and_bounds_each_fetch(make_config):
+    async def run():
+        config = make_config(MODEL, startup={"concurrency": 1})
+        assert config.pending == {"hang", "low", "high"}
+        assert "Loading" in await config.get_rendered("low")
+
+        order = []
+        for name in MODEL:
+            config.subscribe(lambda m, name=name: m.get(name), lambda _, name=name: order.append(name), keys=[name])
+
+        start = time.monotonic()
+        await config.refresh()
+        assert time.monotonic() - start < 2
+        assert order == ["high", "low"]
+        assert config.pending == set()
+        assert config.state["hang"] is None
+
+    asyncio.run(run())
+
+
+def test_failed_initial_fetch_renders_as_unavailable(make_config):
+    async def run():
+        config = make_config({"shot": {"get": {"type": "shell", "cmd": "sleep 5"}, "timeout": 0.2, "renderer": "image"}})
+        rendered = []
+        config.refresh_listeners["shot"] = [rendered.append]
+        await config.refresh()
+        assert rendered == [None]
+        assert config.state["shot"] is None and "shot" in config.failed
+        assert "Unavailable" in await config.get_rendered("shot")
+        assert "No image" in config.delegates["shot"].renderer.render_data(None)
+
+    asyncio.run(run())
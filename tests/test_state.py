@@ -0,0 +1,96 @@
+import asyncio
+
+from frame.fingerprint import changed_paths, fingerprint
+from frame.namespace import Namespace
+
+
+def test_fingerprint_follows_equality():
+    assert fingerprint({"a": [1, {"b": 2}], "c": 3}) == fingerprint({"c": 3, "a": [1, {"b": 2}]})
+    assert fingerprint([1, 2]) != fingerprint([2, 1])
+    assert fingerprint([1]) != fingerprint((1,))
+    # -1 and -2 have the same hash() in CPython, but not the same digest
+    assert fingerprint(-1) != fingerprint(-2)
+
+
+def test_changed_paths_finds_the_changed_items():
+    old = fingerprint({"a": [1, 2], "b": {"c": 3, "d": 4}})
+    new = fingerprint({"a": [1, 5, 6], "b": {"c": 3}, "e": 7})
+    assert sorted(changed_paths(old, new), key=repr) == [("a", 1), ("a", 2), ("b", "d"), ("e",)]
+    assert list(changed_paths(old, old)) == []
+
+
+def test_subscribers_see_every_change(make_config):
+    async def run():
+        config = make_config()
+        seen = []
+        config.subscribe(lambda m: m.get("x"), seen.append, keys=["x"])
+        # -1 and -2 have the same hash in CPython
+        for value in [-1, -2, -2, -1, [1, -1], [1, -2]]:
+            with config.mutable() as m:
+                m["x"] = value
+        assert seen == [-1, -2, -1, [1, -1], [1, -2]]
+
+    asyncio.run(run())
+
+
+def test_in_place_edits_are_detected_and_isolated(make_config):
+    async def run():
+        config = make_config()
+        seen = []
+        with config.mutable() as m:
+            m["x"] = {"items": [1]}
+        before = config.state
+        config.subscribe(lambda m: m.get("x"), seen.append, keys=["x"])
+
+        with config.mutable() as m:
+            m["x"]["items"].append(2)
+        assert seen == [{"items": [1, 2]}]
+        assert before["x"] == {"items": [1]}
+
+    asyncio.run(run())
+
+
+def test_triggers_are_dropped_with_their_last_subscriber(make_config):
+    config = make_config()
+    baseline = len(config.triggers)
+    seen = []
+    subscriptions = [
+        config.subscribe(lambda m: m.get("x"), seen.append, keys=["x"]),
+        config.subscribe(lambda m: m.get("x"), seen.append, keys=["system.*", "y"]),
+        config.subscribe(lambda m: m.get("x"), seen.append),
+    ]
+    shared = subscriptions[0].trigger.subscribe(seen.append)
+
+    for subscription in subscriptions:
+        subscription.unsubscribe()
+    assert subscriptions[0].trigger in config.triggers
+    shared.unsubscribe()
+
+    assert len(config.triggers) == baseline
+    assert "x" not in config.key_triggers and "y" not in config.key_triggers
+    assert config.prefix_triggers.find("system") is None
+    assert all(trigger in config.triggers for trigger in config.unkeyed_triggers)
+
+
+def test_prefix_subscriptions_and_dotted_access(make_config):
+    namespace = Namespace()
+    namespace.add("host.system.cpu")
+    namespace.add("host.system", "item")
+    assert list(namespace.root.names()) == ["host.system.cpu"]
+    assert [node.items for node in namespace.ancestors("host.system.cpu")][-1] == ["item"]
+    namespace.remove("host.system", "item")
+    namespace.remove("host.system.cpu")
+    assert namespace.root.children == {}
+
+    async def run():
+        config = make_config({"system.cpu": {"get": {"type": "shell", "cmd": "echo 1"}}})
+        seen = []
+        config.subscribe(lambda m: m.get("system.cpu"), seen.append, keys=["system.*"])
+        with config.mutable() as m:
+            m["system.cpu"] = 1
+        with config.mutable() as m:
+            m["other"] = 2
+        assert seen == [1]
+        assert config.accessor().system.cpu == 1
+
+    asyncio.run(run())
@@ -0,0 +1,43 @@
+import asyncio
+
+from frame.utility import CoalescingQueue
+
+MODEL = {"fast": {"get": {"type": "shell", "cmd": "echo fast"}, "max_fps": 10}}
+
+
+def test_coalescing_queue_keeps_the_latest_value_per_key():
+    async def run():
+        queue = CoalescingQueue()
+        for i in range(5):
+            queue.put("a", i)
+        queue.put("b", 0)
+        assert len(queue) == 2
+        assert await queue.get() == ("a", 4)
+        assert await queue.get_all() == {"b": 0}
+
+    asyncio.run(run())
+
+
+def test_rendered_updates_are_limited_to_max_fps(make_config):
+    async def run():
+        config = make_config(MODEL)
+        queue = CoalescingQueue()
+        with config.subscribe_rendered_updates("fast", queue):
+            for i in range(20):
+                with config.mutable() as m:
+                    m["fast"] = i
+            # The first change goes straight out and the rest of the burst is held back
+            assert len(queue) == 1
+            await queue.get()
+            await asyncio.sleep(0.15)
+            assert list(queue.items) == ["fast"]
+            assert config.state["fast"] == 19
+
+        await queue.get()
+        # Changes after unsubscribing no longer reach the queue
+        with config.mutable() as m:
+            m["fast"] = 20
+        await asyncio.sleep(0.15)
+        assert len(queue) == 0
+
+    asyncio.run(run())
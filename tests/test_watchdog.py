@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+from frame.watchdog import LoopMonitor
+
+
+def test_callback_timing_is_opt_in_and_undone_by_stop():
+    original = asyncio.Handle._run
+
+    async def run(settings):
+        monitor = LoopMonitor()
+        monitor.configure(settings)
+        monitor.start()
+        patched = asyncio.Handle._run is not original
+
+        asyncio.get_running_loop().call_soon(time.sleep, 0.05)
+        await asyncio.sleep(0.1)
+        monitor.stop()
+        return monitor, patched
+
+    monitor, patched = asyncio.run(run({"interval": 0.01}))
+    assert not patched and not monitor.slow and monitor.lags
+
+    monitor, patched = asyncio.run(run({"callbacks": True, "interval": 0.01, "threshold": 0.02}))
+    assert patched
+    assert asyncio.Handle._run is original
+    assert [entry["callback"] for entry in monitor.slow] == ["sleep"]
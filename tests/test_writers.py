@@ -0,0 +1,61 @@
+import asyncio
+import os
+import time
+
+from frame.writers import WriterThread, file_writers
+
+
+def test_rotate_bytes_counts_encoded_bytes(tmp_path):
+    path = str(tmp_path / "log.txt")
+    writers = WriterThread()
+    writers.configure(path, {"rotate_bytes": 11})
+    writers.write(path, "ééééé\n")
+    writers.flush().result()
+    # Six characters, but eleven bytes: one more byte goes past the limit
+    writers.write(path, "x")
+    writers.flush().result()
+    writers.close()
+
+    with open(path + ".1", encoding="utf-8") as f:
+        assert f.read() == "ééééé\n"
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "x"
+
+
+def test_failing_fsync_does_not_stop_the_writer_thread(tmp_path, monkeypatch):
+    def fsync(fd):
+        raise OSError("disk gone")
+
+    path = str(tmp_path / "log.txt")
+    writers = WriterThread()
+    writers.configure(path, {"flush_interval": 0, "fsync_interval": 0.01})
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "fsync", fsync)
+        writers.write(path, "a\n").result(5)
+        time.sleep(0.05)
+        writers.write(path, "b\n").result(5)
+        assert writers.thread.is_alive()
+    writers.close()
+
+    with open(path) as f:
+        assert f.read() == "a\nb\n"
+
+
+def test_removed_file_write_action_releases_its_writer(tmp_path, make_config, describe_config):
+    path = str(tmp_path / "out.txt")
+    action = {"type": "file_write", "path": path, "template": "{{ value }}"}
+
+    async def run():
+        config = make_config(actions={"write": action})
+
+        # Rebuilding the action on the same path keeps the file configured
+        config.reload(describe_config(actions={"write": {**action, "template": "{{ value }}!"}}))
+        file_writers.flush().result()
+        assert file_writers.writers[path].users == 1
+
+        config.reload(describe_config())
+        file_writers.flush().result()
+        assert path not in file_writers.writers
+        assert not os.path.exists(path)
+
+    asyncio.run(run())